@@ -0,0 +1,363 @@
+import os
+import sys
+import gzip
+import json
+import argparse
+import platform
+import subprocess
+import tempfile
+import tracemalloc
+from time import perf_counter
+from datetime import datetime
+import numpy as np
+from cdflib.cdfwrite import CDF as CdfWriter
+from configuration import Configuration
+from engine import PassEngine
+from lshell import LShellModel
+from mlt import MltModel
+from mockserver import MockModelServer
+from models import IriModelAccess, IgrfModelAccess
+from cache import ModelCache
+from readers import DataReader
+from records import RecordBatch
+from transport import ModelTransport
+import warnings
+with warnings.catch_warnings():
+    warnings.filterwarnings('ignore', category=FutureWarning)
+    import h5py
+
+
+class Benchmark:
+
+    # columns of the Madrigal DMSP UT files (dms_ut_*.002)
+    MADRIGAL_COLUMNS = (
+        ('year', 'i8'), ('month', 'i8'), ('day', 'i8'),
+        ('hour', 'i8'), ('min', 'i8'), ('sec', 'i8'),
+        ('recno', 'i8'), ('kindat', 'i8'), ('kinst', 'i8'),
+        ('ut1_unix', 'f8'), ('ut2_unix', 'f8'),
+        ('gdalt', 'f8'), ('gdlat', 'f8'), ('glon', 'f8'),
+        ('mlat', 'f8'), ('mlt', 'f8'),
+        ('ni', 'f8'), ('po+', 'f8'), ('phe+', 'f8'), ('ph+', 'f8'),
+        ('ti', 'f8'), ('te', 'f8'),
+        ('rpa_flag_ut', 'i8'), ('idm_flag_ut', 'i8'))
+
+    BOX = {'lat': '-65', 'long': '-64', 'dlat': '10', 'dlong': '20',
+           'point_lat': '-65.25', 'point_long': '-64.25'}
+
+    @staticmethod
+    def track(start, hours, cadence, altitude, phase=0.0, seed=0):
+        # circular sun-synchronous like orbit over the rotating Earth
+        t = np.arange(0, hours * 3600.0, cadence)
+        inclination = np.radians(98.8)
+        u = 2 * np.pi * t / (101.0 * 60) + phase
+        lat = np.degrees(np.arcsin(np.sin(inclination) * np.sin(u)))
+        lon = np.degrees(np.arctan2(np.cos(inclination) * np.sin(u),
+                                    np.cos(u))) - 360.0 * t / 86164.0
+        lon = (lon + 180.0) % 360.0 - 180.0
+
+        rng = np.random.default_rng(seed)
+        dates = np.datetime64(start, 's') + t.astype('timedelta64[s]')
+        return {
+            'date': dates,
+            'lat': lat,
+            'long': lon,
+            'alt': altitude + 5 * np.sin(u) + rng.normal(0, 0.5, len(t)),
+            'density': 10 ** rng.uniform(9.5, 11.5, len(t)),
+            'te': rng.uniform(1000, 4000, len(t)),
+            'ti': rng.uniform(800, 2500, len(t)),
+            'mlt': (t / 3600.0 + lon / 15.0) % 24.0,
+            'gaps': rng.random(len(t)) < 0.05,
+        }
+
+    @staticmethod
+    def madrigal_table(track):
+        n = len(track['date'])
+        table = np.zeros(n, dtype=list(Benchmark.MADRIGAL_COLUMNS))
+        dates = track['date']
+        table['year'] = dates.astype('datetime64[Y]').astype(int) + 1970
+        table['month'] = dates.astype('datetime64[M]').astype(int) % 12 + 1
+        table['day'] = (dates.astype('datetime64[D]') -
+                        dates.astype('datetime64[M]')).astype(int) + 1
+        seconds = (dates - dates.astype('datetime64[D]')).astype(int)
+        table['hour'] = seconds // 3600
+        table['min'] = seconds // 60 % 60
+        table['sec'] = seconds % 60
+        table['recno'] = np.arange(n)
+        table['kindat'] = 10242
+        table['kinst'] = 8100
+        table['ut1_unix'] = dates.astype(int)
+        table['ut2_unix'] = dates.astype(int) + 4
+        table['gdalt'] = track['alt']
+        table['gdlat'] = track['lat']
+        table['glon'] = track['long']
+        table['mlat'] = track['lat']
+        table['mlt'] = track['mlt']
+        table['ni'] = track['density']
+        table['po+'] = np.where(track['gaps'], np.nan, 0.9)
+        table['phe+'] = np.nan
+        table['ph+'] = np.nan
+        table['ti'] = np.where(track['gaps'], np.nan, track['ti'])
+        table['te'] = track['te']
+        table['rpa_flag_ut'] = 3
+        table['idm_flag_ut'] = 4
+        return table
+
+    @staticmethod
+    def write_hdf5(filename, track):
+        with h5py.File(filename, 'w') as file:
+            file.create_dataset(
+                'Data/Table Layout', data=Benchmark.madrigal_table(track),
+                chunks=True, compression='gzip')
+
+    @staticmethod
+    def write_txt(filename, track):
+        table = Benchmark.madrigal_table(track)
+        names = table.dtype.names
+        with gzip.open(filename, 'wt') as file:
+            # Madrigal cuts the flag names short
+            header = [{'rpa_flag_ut': 'RPA_FLAG_', 'idm_flag_ut': 'IDM_FLAG_'}
+                      .get(name, name.upper()) for name in names]
+            file.write(' '.join('{:>10s}'.format(name) for name in header) +
+                       '\n')
+            formats = ' '.join('{:10d}' if table.dtype[name].kind == 'i'
+                               else '{:10.5g}' for name in names) + '\n'
+            for row in table.tolist():
+                file.write(formats.format(*row))
+
+    @staticmethod
+    def write_cdf(filename, track):
+        milliseconds = track['date'].astype('datetime64[ms]').astype(float)
+        variables = (
+            ('Timestamp', 31, milliseconds + DataReader.CDF_EPOCH_1970),
+            ('Latitude', 45, track['lat']),
+            ('Longitude', 45, track['long']),
+            ('Height', 45, track['alt']),
+            ('Density', 45, track['density'] / 1e6),
+            ('Te_hgn', 45, track['te']),
+            ('Te_lgn', 45, track['te'] * 1.05),
+            ('T_elec', 45, track['te'] * 1.02),
+        )
+
+        cdf = CdfWriter(filename, cdf_spec={'Compressed': 6}, delete=True)
+        for name, data_type, data in variables:
+            cdf.write_var({'Variable': name, 'Data_Type': data_type,
+                           'Num_Elements': 1, 'Rec_Vary': True,
+                           'Dim_Sizes': []}, var_data=data)
+        cdf.close()
+
+    @staticmethod
+    def generate(directory, days, hours, cadence, swarm_cadence):
+        os.makedirs(directory, exist_ok=True)
+        files = []
+        for day in range(days):
+            start = np.datetime64('2015-03-17') + np.timedelta64(day, 'D')
+            stamp = str(start).replace('-', '')
+            dmsp = Benchmark.track(start, hours, cadence, 850.0, 0.3, day)
+            swarm = Benchmark.track(start, hours, swarm_cadence, 460.0,
+                                    1.1, 100 + day)
+
+            names = (
+                ('dms_ut_{}_16.002.hdf5'.format(stamp), Benchmark.write_hdf5,
+                 dmsp),
+                ('dms_ut_{}_17.002.txt.gz'.format(stamp), Benchmark.write_txt,
+                 dmsp),
+                ('SW_EXTD_EFIA_LP_HM_{0}T000000_{0}T235959_0101.cdf'
+                 .format(stamp), Benchmark.write_cdf, swarm),
+            )
+            for name, write, track in names:
+                write(os.path.join(directory, name), track)
+                files.append(os.path.join(directory, name))
+        return files
+
+    @staticmethod
+    def measure(function, repeat=3):
+        # the best of a few runs, the peak memory from one traced run
+        seconds = []
+        for _ in range(repeat):
+            start = perf_counter()
+            result = function()
+            seconds.append(perf_counter() - start)
+
+        tracemalloc.start()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return result, min(seconds), peak
+
+    @staticmethod
+    def configuration(directory, cache_dir, server, **values):
+        values = dict(Benchmark.BOX, directory=directory,
+                      cache_dir=cache_dir, rate_limit='0',
+                      file_index='0', **values)
+        values.update(server.urls())
+        return Configuration.parse(values)
+
+    @staticmethod
+    def run(args):
+        results = dict()
+
+        def record(name, rows, function, repeat=args.repeat):
+            _, seconds, peak = Benchmark.measure(function, repeat)
+            results[name] = {
+                'seconds': seconds,
+                'rows': rows,
+                'rows_per_second': rows / seconds if seconds else 0.0,
+                'peak_memory_mb': peak / 2**20,
+            }
+            print('{:<16s}{:>10.3f} s{:>12d} rows{:>14.0f} rows/s{:>10.1f} MB'
+                  .format(name, seconds, rows,
+                          results[name]['rows_per_second'],
+                          results[name]['peak_memory_mb']))
+
+        with tempfile.TemporaryDirectory() as temp:
+            directory = args.data_dir or os.path.join(temp, 'data')
+            files = Benchmark.generate(directory, args.days, args.hours,
+                                       args.cadence, args.swarm_cadence)
+
+            server = MockModelServer(latency=args.latency).start()
+            try:
+                configuration = Benchmark.configuration(
+                    directory, os.path.join(temp, 'cache'), server,
+                    max_requests=str(args.max_requests))
+                engine = PassEngine(configuration, log=lambda text: None)
+
+                batches = []
+                for suffix, name in (('.hdf5', 'read_hdf5'),
+                                     ('.txt.gz', 'read_txt'),
+                                     ('.cdf', 'read_cdf')):
+                    selected = [f for f in files if f.endswith(suffix)]
+                    data = [DataReader.read(f) for f in selected]
+                    batches.extend(data)
+                    record(name, sum(len(d) for d in data),
+                           lambda: [DataReader.read(f) for f in selected])
+                    record(name + '_box', sum(len(d) for d in data),
+                           lambda: [DataReader.read(f, 'Te_hgn',
+                                                    configuration)
+                                    for f in selected])
+
+                data = RecordBatch.concatenate(batches)
+                record('filter', len(data),
+                       lambda: engine.filter(data, configuration))
+
+                inside = engine.filter(data, configuration)
+                points = inside.select(np.arange(
+                    min(args.lookups, len(inside))))
+                record('lshell_local', len(points), lambda: LShellModel()
+                       .get_data(points['date'], points['lat'],
+                                 points['long'], points['alt']), 1)
+                record('mlt_local', len(data), lambda: MltModel()
+                       .get_data(data['date'], data['lat'], data['long']))
+
+                def lookups(model):
+                    transport = ModelTransport(args.max_requests, 0)
+                    if model == 'iri':
+                        client = IriModelAccess(None, ModelCache(), transport)
+                        client.url = server.urls()['iri_url']
+                        calls = [(client.get_data_cached, d['date'], d['lat'],
+                                  d['long'], 3, False)
+                                 for d in points.rows()]
+                    else:
+                        client = IgrfModelAccess(None, ModelCache(),
+                                                 transport=transport)
+                        client.url_igrf = server.urls()['igrf_url']
+                        calls = [(client.get_data_cached, d['date'].year,
+                                  d['lat'], d['long'], d['alt'])
+                                 for d in points.rows()]
+                    futures = [transport.submit(*call) for call in calls]
+                    result = [future.result() for future in futures]
+                    transport.close()
+                    return result
+
+                record('iri_lookups', len(points), lambda: lookups('iri'), 1)
+                record('igrf_lookups', len(points), lambda: lookups('igrf'),
+                       1)
+
+                def end_to_end():
+                    # a cold model cache for every run
+                    with tempfile.TemporaryDirectory() as cache_dir:
+                        run = PassEngine(
+                            Benchmark.configuration(
+                                directory, cache_dir, server,
+                                max_requests=str(args.max_requests),
+                                workers=str(args.workers)),
+                            log=lambda text: None,
+                            output=lambda values: None)
+                        return run.run()
+
+                record('end_to_end', len(data), end_to_end, 1)
+            finally:
+                server.stop()
+
+        return results
+
+    @staticmethod
+    def commit():
+        try:
+            return subprocess.check_output(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stderr=subprocess.DEVNULL).decode().strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    @staticmethod
+    def compare(results, filename):
+        with open(filename) as file:
+            previous = json.load(file)
+
+        print('Compared with {} ({}):'.format(
+            previous.get('commit'), previous.get('date')))
+        for name, result in results.items():
+            old = previous['results'].get(name)
+            if not old or not old['rows_per_second']:
+                continue
+            change = result['rows_per_second'] / old['rows_per_second'] - 1
+            print('{:<16s}{:>+9.1%}'.format(name, change))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Throughput of the readers, the filter, the models '
+                    'and the whole run on synthetic archives.')
+    parser.add_argument('--days', type=int, default=2,
+                        help='files of every format (one per day)')
+    parser.add_argument('--hours', type=float, default=24.0,
+                        help='hours of data per file')
+    parser.add_argument('--cadence', type=float, default=4.0,
+                        help='DMSP sample interval, s')
+    parser.add_argument('--swarm-cadence', type=float, default=1.0,
+                        help='Swarm sample interval, s')
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='model server response delay, s')
+    parser.add_argument('--lookups', type=int, default=200,
+                        help='model lookups per model benchmark')
+    parser.add_argument('--max-requests', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--data-dir',
+                        help='keep the synthetic files in this directory')
+    parser.add_argument('-o', '--output', help='JSON results file')
+    parser.add_argument('--compare', metavar='JSON',
+                        help='results of a previous run to compare with')
+    args = parser.parse_args(argv)
+
+    results = Benchmark.run(args)
+    report = {
+        'commit': Benchmark.commit(),
+        'date': datetime.now().replace(microsecond=0).isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'parameters': vars(args),
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    if args.compare:
+        Benchmark.compare(results, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
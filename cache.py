@@ -0,0 +1,87 @@
+import os
+import json
+import sqlite3
+import threading
+from itertools import count
+
+
+class ModelCache:
+
+    def __init__(self, filename=':memory:', table='cache', max_entries=10000):
+        if filename != ':memory:':
+            directory = os.path.dirname(filename)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        self.table = table
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS {} ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, used INTEGER NOT NULL)'
+            .format(self.table))
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS {0}_used ON {0} (used)'
+            .format(self.table))
+        self.connection.commit()
+
+        # access order survives restarts, so LRU eviction spans runs
+        last_used, = self.connection.execute(
+            'SELECT MAX(used) FROM {}'.format(self.table)).fetchone()
+        self.clock = count((last_used or 0) + 1)
+
+    def __len__(self):
+        with self.lock:
+            n, = self.connection.execute(
+                'SELECT COUNT(*) FROM {}'.format(self.table)).fetchone()
+        return n
+
+    def get(self, key):
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT value FROM {} WHERE key = ?'.format(self.table),
+                (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.connection.execute(
+                'UPDATE {} SET used = ? WHERE key = ?'.format(self.table),
+                (next(self.clock), key))
+            self.connection.commit()
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO {} (key, value, used) '
+                'VALUES (?, ?, ?)'.format(self.table),
+                (key, json.dumps(value), next(self.clock)))
+
+            n, = self.connection.execute(
+                'SELECT COUNT(*) FROM {}'.format(self.table)).fetchone()
+            if n > self.max_entries:
+                self.connection.execute(
+                    'DELETE FROM {0} WHERE key IN ('
+                    'SELECT key FROM {0} ORDER BY used LIMIT ?)'
+                    .format(self.table),
+                    (n - self.max_entries,))
+            self.connection.commit()
+
+    def statistics(self):
+        requests = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / requests if requests else 0.0,
+            'entries': len(self),
+        }
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
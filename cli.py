@@ -0,0 +1,72 @@
+import sys
+import argparse
+from datetime import datetime
+from configuration import Configuration
+from engine import PassEngine
+from writers import ResultWriter
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Search for satellite passes without the GUI.')
+    parser.add_argument('-c', '--config', default='config.ini',
+                        help='configuration file (default: config.ini)')
+    parser.add_argument('-d', '--directory',
+                        help='directory with input files')
+    parser.add_argument('-o', '--output', default='results.txt',
+                        help='results file, .h5/.hdf5 and .npz are written '
+                             'as binary tables (default: results.txt)')
+    parser.add_argument('-m', '--metrics',
+                        help='write the run metrics to this JSON file')
+    parser.add_argument('-s', '--set', action='append', default=[],
+                        metavar='KEY=VALUE',
+                        help='override a configuration value')
+    args = parser.parse_args(argv)
+
+    values = Configuration.load(args.config)
+    if args.directory:
+        values['directory'] = args.directory
+    if args.metrics:
+        values['metrics_file'] = args.metrics
+    for item in args.set:
+        key, _, value = item.partition('=')
+        values[key.strip()] = value.strip()
+
+    configuration = Configuration.parse(values)
+    if configuration is None:
+        print('Input parameters are incorrect.', file=sys.stderr)
+        return 2
+
+    # every target of a targets file gets its own results file
+    names = [target['name'] for target in configuration['targets'] or []]
+    writers = dict()
+    try:
+        writer = ResultWriter.create(args.output) if not names else None
+        for name in names:
+            writers[name] = ResultWriter.create(
+                ResultWriter.target_filename(args.output, name))
+    except IOError:
+        for target_writer in writers.values():
+            target_writer.close()
+        print('Error writing to file', file=sys.stderr)
+        return 2
+
+    try:
+        engine = PassEngine(
+            configuration, log=print,
+            output=writer.write if writer is not None else None,
+            target_output=lambda name: writers[name].write)
+        status = engine.run()
+    finally:
+        for target_writer in list(writers.values()) + [writer]:
+            if target_writer is not None:
+                target_writer.close()
+
+    print('OK' if status else 'Error')
+    time = datetime.now().replace(microsecond=0)
+    print('{}. Processing ended.'.format(time))
+    return 0 if status else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,240 @@
+import os
+import numpy as np
+
+
+class Configuration:
+
+    TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+    @staticmethod
+    def load(filename='config.ini'):
+        values = dict()
+
+        try:
+            with open(filename) as file:
+                lines = file.readlines()
+
+            for line in lines:
+                if not line.strip():
+                    continue
+                key, value = [x.strip() for x in line.split('=', 1)]
+                values[key] = value
+        except IOError:
+            pass
+
+        return values
+
+    @staticmethod
+    def save(values, filename='config.ini'):
+        s = ''
+        for key in values:
+            val = str(values[key]).strip()
+            if val:
+                s += '{} = {}\n'.format(key, val)
+
+        with open(filename, 'w') as file:
+            file.write(s)
+
+    @staticmethod
+    def flag(values, name, default=False):
+        if name not in values or not str(values[name]).strip():
+            return default
+        return str(values[name]).strip().lower() in Configuration.TRUE_VALUES
+
+    @staticmethod
+    def load_targets(filename):
+        # one target per line: [name] lat long dlat dlong point_lat point_long
+        names = ('lat', 'long', 'dlat', 'dlong', 'point_lat', 'point_long')
+        targets = []
+        with open(filename) as file:
+            for line in file:
+                fields = line.split('#', 1)[0].replace(',', ' ').split()
+                if not fields:
+                    continue
+                if len(fields) == len(names):
+                    fields.insert(0, 'target{}'.format(len(targets) + 1))
+                if len(fields) != len(names) + 1:
+                    raise ValueError(line)
+                target = dict(zip(names, fields[1:]))
+                target['name'] = fields[0]
+                targets.append(target)
+
+        if len(set(target['name'] for target in targets)) < len(targets):
+            raise ValueError('duplicate target names')
+        return targets
+
+    @staticmethod
+    def parse_target(values):
+        result = dict()
+        if 'name' in values:
+            result['name'] = values['name']
+        result['dmsp_lat'] = float(values['lat'])
+        result['dmsp_long'] = float(values['long'])
+        result['dmsp_dlat'] = float(values['dlat'])
+        result['dmsp_dlong'] = float(values['dlong'])
+        result['point_lat'] = float(values['point_lat'])
+        result['point_long'] = float(values['point_long'])
+        if result['dmsp_long'] > 180.0:
+            result['dmsp_long'] -= 360.0
+        if result['point_long'] > 180.0:
+            result['point_long'] -= 360.0
+        if result['dmsp_dlat'] < 0 or result['dmsp_dlong'] < 0:
+            raise ValueError('negative box size')
+        return result
+
+    @staticmethod
+    def parse(values):
+        result = dict()
+        success = True
+        result['directory_name'] = values.get('directory')
+        if not result['directory_name']:
+            success = False
+
+        result['targets'] = None
+        if values.get('targets'):
+            try:
+                result['targets'] = [
+                    Configuration.parse_target(target) for target in
+                    Configuration.load_targets(values['targets'])]
+            except (IOError, KeyError, ValueError):
+                success = False
+            if not result['targets']:
+                success = False
+
+        try:
+            # with a targets file the single box is the first target
+            if result['targets']:
+                result.update(result['targets'][0])
+                del result['name']
+            else:
+                result.update(Configuration.parse_target(values))
+            if values.get('shell') or values.get('dshell'):
+                result['l_shell_set'] = float(values['shell'])
+                result['dl_shell_set'] = float(values['dshell'])
+                if result['l_shell_set'] < 0 or result['dl_shell_set'] < 0:
+                    success = False
+        except (KeyError, ValueError):
+            success = False
+
+        result['proxy_host'] = values.get('proxy_host', '').strip()
+        result['proxy_port'] = values.get('proxy_port', '').strip()
+        if result['proxy_port']:
+            try:
+                result['proxy_port'] = int(result['proxy_port'])
+            except ValueError:
+                success = False
+
+        result['local_time'] = Configuration.flag(values, 'local_time', True)
+        result['l_shell'] = Configuration.flag(values, 'l_shell', True)
+        result['l_shell_model'] = values.get('l_shell_model') or (
+            'cgm' if Configuration.flag(values, 'cgm') else 'igrf')
+        if result['l_shell_model'] not in ('igrf', 'cgm', 'local'):
+            success = False
+        result['cgm'] = result['l_shell_model'] == 'cgm'
+        result['mlt_model'] = values.get('mlt_model') or 'iri'
+        if result['mlt_model'] not in ('iri', 'local'):
+            success = False
+        result['te_name'] = values.get('te_name') or 'Te_hgn'
+
+        result['cache_dir'] = values.get('cache_dir') or 'cache'
+        try:
+            result['cache_size'] = int(values.get('cache_size') or 10000)
+            if result['cache_size'] < 1:
+                success = False
+        except ValueError:
+            success = False
+
+        # L-shell lookups are keyed by the exact position unless a grid is
+        # set, e.g. 0.01 degrees and 1 km, which shares a lookup between
+        # nearby samples but moves the L-shell by up to a few thousandths
+        try:
+            result['l_shell_resolution'] = float(
+                values.get('l_shell_resolution') or 0.0)
+            result['l_shell_alt_resolution'] = float(
+                values.get('l_shell_alt_resolution') or 0.0)
+            if result['l_shell_resolution'] < 0 or \
+                    result['l_shell_alt_resolution'] < 0:
+                success = False
+        except ValueError:
+            success = False
+
+        try:
+            result['max_requests'] = int(values.get('max_requests') or 4)
+            result['rate_limit'] = float(values.get('rate_limit') or 1.0)
+            if result['max_requests'] < 1 or result['rate_limit'] < 0:
+                success = False
+        except ValueError:
+            success = False
+
+        try:
+            result['request_timeout'] = float(
+                values.get('request_timeout') or 60.0)
+            result['retry_deadline'] = float(
+                values.get('retry_deadline') or 300.0)
+            if result['request_timeout'] <= 0 or \
+                    result['retry_deadline'] < 0:
+                success = False
+        except ValueError:
+            success = False
+
+        result['pass_summary'] = Configuration.flag(values, 'pass_summary')
+        result['plan_scope'] = values.get('plan_scope') or 'file'
+        if result['plan_scope'] not in ('file', 'directory'):
+            success = False
+        try:
+            result['pass_gap'] = float(values.get('pass_gap') or 600.0)
+            if result['pass_gap'] <= 0:
+                success = False
+        except ValueError:
+            success = False
+
+        try:
+            result['pipeline_depth'] = int(values.get('pipeline_depth') or 2)
+            if result['pipeline_depth'] < 0:
+                success = False
+        except ValueError:
+            success = False
+
+        result['file_index'] = Configuration.flag(values, 'file_index')
+        result['tile_index'] = Configuration.flag(values, 'tile_index')
+        try:
+            result['index_resolution'] = float(
+                values.get('index_resolution') or 5.0)
+            if result['index_resolution'] <= 0:
+                success = False
+        except ValueError:
+            success = False
+
+        # the time window includes start_time and ends before end_time
+        for name in ('start_time', 'end_time'):
+            result[name] = None
+            if values.get(name):
+                try:
+                    result[name] = np.datetime64(
+                        values[name].strip().replace(' ', 'T'), 'us')
+                except ValueError:
+                    success = False
+        if result['start_time'] is not None and \
+                result['end_time'] is not None and \
+                result['start_time'] >= result['end_time']:
+            success = False
+
+        if values.get('result_file'):
+            result['result_file'] = values['result_file']
+        if values.get('metrics_file'):
+            result['metrics_file'] = values['metrics_file']
+
+        for name in ('iri_url', 'igrf_url', 'cgm_url'):
+            if values.get(name):
+                result[name] = values[name]
+
+        try:
+            result['workers'] = int(values.get('workers') or 1)
+            if result['workers'] == 0:
+                result['workers'] = os.cpu_count() or 1
+            if result['workers'] < 0:
+                success = False
+        except ValueError:
+            success = False
+
+        return result if success else None
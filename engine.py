@@ -0,0 +1,541 @@
+from os import path
+from time import perf_counter
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, Future, CancelledError
+from multiprocessing import get_context
+from filelist import FileList
+from fileindex import FileIndex
+from tileindex import TileIndex
+from cache import ModelCache
+import numpy as np
+from formats import Formats
+from lshell import LShellModel
+from metrics import RunMetrics
+from mlt import MltModel, MltProfileIndex
+from models import IriModelAccess, IgrfModelAccess
+from transport import ModelTransport
+from passfilter import PassFilter
+from passes import PassSegmenter
+from pipeline import Pipeline
+from planner import QueryPlanner
+from readers import DataReader
+from records import RecordBatch
+from retry import Cancelled, CancellationToken, RetryScheduler
+
+
+class PassEngine:
+
+    def __init__(self, configuration, log=print, output=None,
+                 target_output=None):
+        self.configuration = configuration
+        self.log = log
+        self.output = output if output is not None else self.log_row
+        self.target_output = target_output
+        self.targets = configuration.get('targets') or [configuration]
+        self.rows_logged = 0
+        self.metrics = RunMetrics()
+        self.token = CancellationToken()
+        self.planners = set()
+        self.in_flight = dict()
+        self.isActive = True
+
+    def terminate(self):
+        # waits for retries and model results are woken up at once
+        self.isActive = False
+        self.token.cancel()
+        for planner in list(self.planners):
+            planner.cancel()
+
+    def log_row(self, values):
+        if not self.rows_logged:
+            self.log(Formats.HEADER)
+        self.rows_logged += 1
+        self.log(Formats.row(self.rows_logged, values))
+
+    def read_input_file(self, filename, rows=None):
+        return DataReader.read(
+            filename, self.configuration['te_name'], self.configuration, rows,
+            (self.configuration['start_time'],
+             self.configuration['end_time']))
+
+    def filter(self, data, configuration):
+        # the time window is a binary search, so it goes first
+        data = data.select(RecordBatch.window(
+            data['date'], configuration.get('start_time'),
+            configuration.get('end_time')))
+        return data.select(
+            PassFilter.mask(data['lat'], data['long'], configuration))
+
+    def load_input_file(self, filename, rows=None):
+        # the timings travel back with the data from the worker processes
+        start = perf_counter()
+        data = self.read_input_file(filename, rows)
+        statistics = {'read': perf_counter() - start, 'filter': 0.0,
+                      'rows_read': 0 if data is None else data.scanned,
+                      'rows_kept': 0}
+        if data is None or not len(data):
+            return None, statistics
+
+        start = perf_counter()
+        data = self.filter(data, self.configuration)
+        statistics['filter'] = perf_counter() - start
+        statistics['rows_kept'] = len(data)
+        return data, statistics
+
+    def run(self):
+        if not self.isActive:
+            return True
+
+        try:
+            with self.metrics.timer('run'):
+                return self.run_files()
+        finally:
+            self.report_metrics()
+
+    def run_files(self):
+        time = datetime.now().replace(microsecond=0)
+        self.log('{}. Processing started.'.format(time))
+        directory_name = self.configuration['directory_name']
+
+        if self.configuration['tile_index']:
+            files, rows = self.query_tiles()
+        else:
+            files = FileList.get(directory_name)
+            if self.configuration['file_index']:
+                files = self.select_files(files)
+            rows = [None] * len(files)
+        file_names = [directory_name + '/' + filename for filename in files]
+
+        # the models are opened first, so a failure here leaves no worker
+        # pool behind
+        self.open_models()
+
+        depth = self.configuration['pipeline_depth']
+        workers = self.configuration.get('workers', 1)
+        if workers > 1 and len(files) > 1:
+            # files are read in parallel, results come back in file order;
+            # workers are spawned since the GUI runs the engine in a thread
+            executor = ProcessPoolExecutor(
+                min(workers, len(files)), mp_context=get_context('spawn'))
+            results = Pipeline.bounded_map(
+                executor, load_input_file, workers + depth, file_names,
+                [self.configuration] * len(files), rows)
+        else:
+            executor = None
+            results = map(self.load_input_file, file_names, rows)
+
+        # the next files are read, and their lookups sent, in stages of
+        # their own while the rows of the current file are written; the
+        # queues between the stages hold at most depth files
+        results = Pipeline.stage(results, depth, self.token)
+        plans = None
+        try:
+            # the model lookups of all targets of a file are planned
+            # together, or of all files with the directory scope
+            groups = self.load_batches(files, results)
+            if self.configuration['plan_scope'] == 'directory':
+                groups = [[batch for group in groups for batch in group]]
+
+            plans = Pipeline.stage(map(self.plan, groups), depth, self.token)
+            for planner, planned in plans:
+                if not self.process(planner, planned):
+                    return False
+        finally:
+            if plans is not None:
+                plans.close()
+            results.close()
+            for planner in list(self.planners):
+                planner.cancel()
+            if executor is not None:
+                # only the few files being read are waited for
+                executor.shutdown(wait=True, cancel_futures=True)
+            self.close_models()
+
+        return True
+
+    def select_files(self, files):
+        # files whose ground track never enters the box are not read
+        directory_name = self.configuration['directory_name']
+        index = FileIndex(
+            path.join(self.configuration['cache_dir'], 'files.sqlite'),
+            self.configuration['index_resolution'])
+        try:
+            selected = [
+                filename for filename in files
+                if self.isActive and index.intersects(
+                    directory_name + '/' + filename, self.configuration)]
+        finally:
+            index.close()
+
+        if len(selected) < len(files):
+            self.log('{} of {} files were skipped by the file index.'.format(
+                len(files) - len(selected), len(files)))
+        return selected
+
+    def query_tiles(self):
+        # only the row spans of the tiles around the box are read
+        directory_name = self.configuration['directory_name']
+        index = TileIndex(
+            path.join(self.configuration['cache_dir'], 'tiles'),
+            self.configuration['index_resolution'])
+        indexed, dropped = index.update(
+            directory_name, self.configuration['te_name'])
+        if indexed or dropped:
+            self.log('Tile index: {} files indexed, {} dropped.'.format(
+                indexed, dropped))
+
+        spans = index.query(self.configuration, directory_name,
+                            self.configuration['start_time'],
+                            self.configuration['end_time'])
+        files = sorted(path.relpath(filename, directory_name)
+                       for filename in spans)
+        self.log('{} files have samples near the box.'.format(len(files)))
+        return files, [spans[path.abspath(path.join(directory_name, f))]
+                       for f in files]
+
+    def load_batches(self, files, results):
+        directory_name = self.configuration['directory_name']
+        for filename, (data, statistics) in zip(files, results):
+
+            self.metrics.add_file(filename, statistics)
+            if not self.isActive:
+                return
+
+            self.log('Reading \'{}\' from \'{}\'...'.format(
+                filename, directory_name))
+            if data is None:
+                self.log('No data available in file.')
+                continue
+
+            # the file is read once, all the boxes are tested together
+            batches = []
+            if len(self.targets) > 1:
+                masks = PassFilter.masks(data['lat'], data['long'],
+                                         self.targets)
+            for i, target in enumerate(self.targets):
+                selected = data.select(masks[i]) \
+                    if len(self.targets) > 1 else data
+                if 'name' in target:
+                    self.log('Target \'{}\':'.format(target['name']))
+
+                passes = PassSegmenter.split(
+                    selected, self.configuration['pass_gap'])
+                num = len(passes)
+                if num > 1:
+                    self.log('{} passes ({} samples) were found.'.format(
+                        num, len(selected)))
+                elif num == 1:
+                    self.log('1 pass ({} samples) was found.'.format(
+                        len(selected)))
+                else:
+                    self.log('No passes were found.')
+                    continue
+
+                batches.append((self.summarize(selected, passes, target),
+                                target))
+
+            if batches:
+                yield batches
+
+    def summarize(self, data, passes, target):
+        closest = []
+        for n, index in enumerate(passes):
+            summary = PassSegmenter.summary(data, index, target)
+            self.log(Formats.PASS_FORMAT.format(
+                n + 1, summary['count'], summary['sat_id'],
+                summary['entry'].replace(microsecond=0).isoformat(),
+                summary['exit'].replace(microsecond=0).isoformat(),
+                summary['distance'],
+                data['date'][summary['closest']].item().replace(
+                    microsecond=0).isoformat()))
+            closest.append(summary['closest'])
+
+        # only the closest approach of every pass goes to the models
+        # and to the results
+        if self.configuration['pass_summary']:
+            return data.select(np.array(closest))
+        return data
+
+    def open_models(self):
+        proxy_host = self.configuration['proxy_host']
+        proxy_port = self.configuration['proxy_port']
+        proxy = {'proxy_host': proxy_host,
+                 'proxy_port': proxy_port} if proxy_host else None
+
+        self.transport = ModelTransport(
+            self.configuration['max_requests'],
+            self.configuration['rate_limit'], self.metrics, self.token,
+            self.configuration['request_timeout'])
+        self.retry = RetryScheduler(
+            self.token, deadline=self.configuration['retry_deadline'],
+            metrics=self.metrics)
+
+        self.iri_cache = ModelCache(
+            path.join(self.configuration['cache_dir'], 'models.sqlite'),
+            'iri', self.configuration['cache_size'])
+        self.iri = IriModelAccess(proxy, self.iri_cache, self.transport,
+                                  self.metrics, self.retry)
+
+        self.igrf_cache = ModelCache(
+            path.join(self.configuration['cache_dir'], 'models.sqlite'),
+            'igrf', self.configuration['cache_size'])
+        self.igrf = IgrfModelAccess(
+            proxy, self.igrf_cache,
+            self.configuration['l_shell_resolution'],
+            self.configuration['l_shell_alt_resolution'],
+            self.transport, self.metrics, self.retry)
+
+        self.lshell = LShellModel() \
+            if self.configuration['l_shell_model'] == 'local' else None
+        self.mlt = MltModel(self.lshell) \
+            if self.configuration['mlt_model'] == 'local' else None
+        self.profile_indices = dict()
+
+        if self.configuration.get('iri_url'):
+            self.iri.url = self.configuration['iri_url']
+        if self.configuration.get('igrf_url'):
+            self.igrf.url_igrf = self.configuration['igrf_url']
+        if self.configuration.get('cgm_url'):
+            self.igrf.url_cgm = self.configuration['cgm_url']
+
+    def close_models(self):
+        for name, cache in (('IRI', self.iri_cache),
+                            ('L-shell', self.igrf_cache)):
+            statistics = cache.statistics()
+            self.log(
+                '{} cache: {} hits, {} misses ({:.0%}), {} entries.'.format(
+                    name, statistics['hits'], statistics['misses'],
+                    statistics['hit_rate'], statistics['entries']))
+            self.metrics.set(name + ' cache', statistics)
+            cache.close()
+        self.transport.close()
+
+    def report_metrics(self):
+        for line in self.metrics.summary():
+            self.log(line)
+
+        filename = self.configuration.get('metrics_file')
+        if filename:
+            try:
+                self.metrics.save(filename)
+            except IOError:
+                self.log('Error writing metrics to \'{}\''.format(filename))
+
+    def plan_requests(self, data, rows, planner, target):
+        l_shells = None
+        if self.configuration['l_shell'] and self.lshell is not None:
+            # the offline model computes the whole batch at once
+            l_shells = self.lshell.get_data(
+                data['date'], data['lat'], data['long'], data['alt'])
+            l_shells = np.where(np.isfinite(l_shells), l_shells, -1).tolist()
+
+        mlts = profiles = None
+        if self.configuration['local_time'] and self.mlt is not None:
+            # MLT of the satellite and the daily MLT profile of the point
+            # are computed offline instead of one IRI request per row
+            mlts = self.mlt.get_data(
+                data['date'], data['lat'], data['long']).tolist()
+            profiles = dict()
+            for day in np.unique(data['date'].astype('datetime64[D]')):
+                profiles[day.item()] = resolved(self.mlt.get_profile(
+                    day, target['point_lat'], target['point_long']).tolist())
+
+        requests = []
+        for i, d in enumerate(rows):
+            date = d['date']
+            mlt = iri_result = l_shell = None
+
+            if mlts is not None:
+                mlt = resolved([mlts[i]])
+                iri_result = profiles[date.date()]
+            elif self.configuration['local_time']:
+                mlt = planner.add(
+                    self.iri.get_data_cached,
+                    date, d['lat'], d['long'], 3, False)
+                iri_result = planner.add(
+                    self.iri.get_data_cached,
+                    datetime(date.year, date.month, date.day),
+                    target['point_lat'], target['point_long'], 3)
+
+            if l_shells is not None:
+                l_shell = resolved([l_shells[i]])
+            elif self.configuration['l_shell']:
+                resolution = self.igrf.resolution
+                l_shell = planner.add(
+                    self.igrf.get_data_cached,
+                    date.year,
+                    self.igrf.quantize(d['lat'], resolution),
+                    self.igrf.quantize(d['long'], resolution),
+                    self.igrf.quantize(d['alt'], self.igrf.alt_resolution),
+                    1, self.configuration['cgm'])
+
+            requests.append((mlt, iri_result, l_shell))
+
+        return requests
+
+    def plan(self, batches):
+        planner = QueryPlanner(self.transport, self.in_flight)
+        self.planners.add(planner)
+        planned = []
+        with self.metrics.timer('plan'):
+            for data, target in batches:
+                # UT hours and the time strings are computed for the batch
+                rows = list(RecordBatch(dict(
+                    data.columns, ut=RecordBatch.ut_hours(data['date']),
+                    time=np.datetime_as_string(
+                        data['date'].astype('datetime64[s]')))).rows())
+                planned.append((rows, target, self.plan_requests(
+                    data, rows, planner, target)))
+
+            # unique lookups are resolved from the cache first, the rest
+            # are in flight before the first row is formatted
+            hits, remote = planner.resolve()
+        self.metrics.add('lookups.requested', planner.requested)
+        self.metrics.add('lookups.cache', hits)
+        self.metrics.add('lookups.remote', remote)
+        if planner.requested:
+            self.log(
+                'Model lookups: {} requested, {} saved by deduplication, '
+                '{} from cache, {} remote.'.format(
+                    planner.requested, planner.saved, hits, remote))
+        return planner, planned
+
+    def process(self, planner, planned):
+        try:
+            for rows, target, requests in planned:
+                if not self.format_rows(rows, requests, target):
+                    return False
+            return True
+        except (CancelledError, Cancelled):
+            # the run was terminated while the models were awaited
+            return True
+        finally:
+            planner.cancel()
+            self.planners.discard(planner)
+
+    def point_times(self, rows, requests, target):
+        missing = '-1'
+        if not self.configuration['local_time']:
+            return [(-1, -1, missing)] * len(rows)
+
+        try:
+            mlts = [float(mlt_request.result()[0])
+                    for mlt_request, _, _ in requests]
+        except (TypeError, ValueError):
+            return None
+
+        iri_result = requests[0][1].result()
+        if iri_result is None:
+            return None
+        if iri_result[0] == '':
+            return [(mlt, -1, missing) for mlt in mlts]
+
+        key = (rows[0]['date'].date(),
+               target['point_lat'], target['point_long'])
+        if key not in self.profile_indices:
+            try:
+                self.profile_indices[key] = MltProfileIndex(iri_result)
+            except ValueError:
+                return None
+
+        kt, date_out = self.profile_indices[key].point_times(
+            [d['date'] for d in rows], mlts)
+        return list(zip(mlts, kt.tolist(),
+                        np.datetime_as_string(date_out, unit='s').tolist()))
+
+    def format_rows(self, rows, requests, target):
+        output = self.output
+        if self.target_output is not None and 'name' in target:
+            output = self.target_output(target['name'])
+
+        # waiting for the models and writing the rows are timed apart
+        # from the formatting itself
+        begin = perf_counter()
+        waiting = writing = 0.0
+        written = 0
+
+        start = 0
+        while start < len(rows) and self.isActive:
+
+            # rows sharing the profile of the point are resolved at once
+            stop = start + 1
+            while stop < len(rows) and \
+                    requests[stop][1] is requests[start][1]:
+                stop += 1
+
+            moment = perf_counter()
+            times = self.point_times(
+                rows[start:stop], requests[start:stop], target)
+            waiting += perf_counter() - moment
+            if times is None:
+                return False
+
+            for d, (_, _, l_shell_request), (mlt, kt, date_out) in zip(
+                    rows[start:stop], requests[start:stop], times):
+
+                if not self.isActive:
+                    break
+
+                l_shell = -1
+
+                if self.configuration['l_shell']:
+                    moment = perf_counter()
+                    l_shell_result = l_shell_request.result()
+                    waiting += perf_counter() - moment
+                    if l_shell_result is None:
+                        return False
+                    l_shell = float(l_shell_result[0])
+
+                if not self.isActive:
+                    break
+
+                values = (
+                    d['sat_id'],
+                    d['lat'], d['long'],
+                    d['alt'],
+                    d['ti'], d['te'],
+                    d['ne'],
+                    d['po'],
+                    d['ph'], d['phe'],
+                    d['rpa'], d['idm'],
+                    d['time'],
+                    d['ut'],
+                    d['mlt'],
+                    mlt,
+                    kt,
+                    date_out,
+                    l_shell
+                )
+
+                needFiltering = 'l_shell_set' in self.configuration
+                if needFiltering and l_shell > 0:
+                    l_shell_set = self.configuration['l_shell_set']
+                    dl_shell_set = self.configuration['dl_shell_set']
+                    keep = abs(l_shell_set - l_shell) < dl_shell_set
+                else:
+                    keep = not needFiltering or l_shell < 0
+
+                if keep:
+                    moment = perf_counter()
+                    output(values)
+                    writing += perf_counter() - moment
+                    written += 1
+
+            start = stop
+
+        self.metrics.record('wait', waiting)
+        self.metrics.record('output', writing)
+        self.metrics.record(
+            'format', perf_counter() - begin - waiting - writing)
+        self.metrics.add('rows.output', written)
+        return True
+
+
+def load_input_file(filename, configuration, rows=None):
+    return PassEngine(configuration).load_input_file(filename, rows)
+
+
+def resolved(value):
+    future = Future()
+    future.set_result(value)
+    return future
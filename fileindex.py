@@ -0,0 +1,138 @@
+import os
+import sqlite3
+import threading
+import numpy as np
+from passfilter import PassFilter
+from readers import DataReader
+
+
+class CoverageGrid:
+
+    def __init__(self, resolution=5.0):
+        self.resolution = resolution
+        self.shape = (int(np.ceil(180 / resolution)),
+                      int(np.ceil(360 / resolution)))
+
+    def cells(self, lats, lons):
+        lons = np.asarray(lons, dtype=float)
+        lons = np.where(lons > 180, lons - 360, lons)
+        i = np.clip(((np.asarray(lats) + 90) // self.resolution).astype(int),
+                    0, self.shape[0] - 1)
+        j = np.clip(((lons + 180) // self.resolution).astype(int),
+                    0, self.shape[1] - 1)
+        return i, j
+
+    def coverage(self, data):
+        grid = np.zeros(self.shape, dtype=bool)
+        valid = np.isfinite(data['lat']) & np.isfinite(data['long'])
+        grid[self.cells(data['lat'][valid], data['long'][valid])] = True
+        return grid
+
+    def box(self, configuration):
+        # every cell touching the box, so no file with a sample
+        # inside the box is ever skipped
+        if configuration.get('targets'):
+            cells = np.zeros(self.shape, dtype=bool)
+            for target in configuration['targets']:
+                cells |= self.box(target)
+            return cells
+
+        (lat_m, lat_p), lon_ranges = PassFilter.bounds(configuration)
+        edges_lat = np.arange(self.shape[0]) * self.resolution - 90
+        edges_lon = np.arange(self.shape[1]) * self.resolution - 180
+
+        rows = (edges_lat <= lat_p) & (edges_lat + self.resolution >= lat_m)
+        columns = np.zeros(self.shape[1], dtype=bool)
+        for lon_min, lon_max in lon_ranges:
+            columns |= (edges_lon <= lon_max) & \
+                (edges_lon + self.resolution >= lon_min)
+        return rows[:, None] & columns[None, :]
+
+
+class FileIndex:
+
+    def __init__(self, filename=':memory:', resolution=5.0):
+        if filename != ':memory:':
+            directory = os.path.dirname(filename)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        self.resolution = resolution
+        self.grid = CoverageGrid(resolution)
+        self.shape = self.grid.shape
+        self.lock = threading.Lock()
+
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS files ('
+            'path TEXT PRIMARY KEY, mtime REAL NOT NULL, '
+            'size INTEGER NOT NULL, resolution REAL NOT NULL, '
+            'start TEXT, end TEXT, sat_id TEXT, coverage BLOB NOT NULL)')
+        self.connection.commit()
+
+    def entry(self, filename):
+        stat = os.stat(filename)
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT mtime, size, resolution, start, end, sat_id, '
+                'coverage FROM files WHERE path = ?',
+                (os.path.abspath(filename),)).fetchone()
+
+        if row is None or row[0] != stat.st_mtime or \
+                row[1] != stat.st_size or row[2] != self.resolution:
+            return None
+
+        return {
+            'start': row[3],
+            'end': row[4],
+            'sat_id': row[5],
+            'coverage': np.unpackbits(np.frombuffer(row[6], dtype=np.uint8),
+                                      count=self.shape[0] * self.shape[1])
+            .reshape(self.shape).astype(bool),
+        }
+
+    def update(self, filename, te_name='Te_hgn'):
+        stat = os.stat(filename)
+        data = DataReader.coordinates(filename, te_name)
+
+        if data is None or not len(data):
+            start = end = sat_id = None
+            coverage = np.zeros(self.shape, dtype=bool)
+        else:
+            start = str(data['date'].min())
+            end = str(data['date'].max())
+            sat_id = ','.join(np.unique(data['sat_id']).tolist())
+            coverage = self.grid.coverage(data)
+
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO files (path, mtime, size, '
+                'resolution, start, end, sat_id, coverage) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (os.path.abspath(filename), stat.st_mtime, stat.st_size,
+                 self.resolution, start, end, sat_id,
+                 np.packbits(coverage).tobytes()))
+            self.connection.commit()
+
+        return {'start': start, 'end': end, 'sat_id': sat_id,
+                'coverage': coverage}
+
+    def get(self, filename, te_name='Te_hgn'):
+        entry = self.entry(filename)
+        if entry is None:
+            entry = self.update(filename, te_name)
+        return entry
+
+    def intersects(self, filename, configuration):
+        entry = self.get(filename, configuration['te_name'])
+        start = configuration.get('start_time')
+        end = configuration.get('end_time')
+        if entry['start'] is not None and (
+                start is not None and np.datetime64(entry['end']) < start or
+                end is not None and np.datetime64(entry['start']) >= end):
+            return False
+        return bool((entry['coverage'] & self.grid.box(configuration)).any())
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,91 @@
+class Formats:
+
+    HEADER_FORMAT = (
+        '{:<6s}'          # n
+        '{:>4s}'          # sat_id
+        '{:>8s}{:>8s}'    # lat, long
+        '{:>8s}'          # alt
+        '{:>8s}{:>8s}'    # ti, te
+        '{:>14s}'         # ne
+        '{:>12s}'         # PO+
+        '{:>12s}{:>12s}'  # PH+, PHe+
+        '{:>6s}{:>6s}'    # RPA, IDM
+        '{:>20s}'         # date for satellite
+        '{:>10s}'         # ut for satellite
+        '{:>10s}'         # mlt
+        '{:>10s}'         # mlt from IRI
+        '{:>10s}'         # UT for Point
+        '{:>20s}'         # date for Point
+        '{:>8s}'          # L-Shell
+    )
+
+    # a row after its number, which is formatted on its own
+    ROW_FORMAT = (
+        '{:>4s}'            # sat_id
+        '{:8.2f}{:8.2f}'    # lat, long
+        '{:>8.2f}'          # alt
+        '{:8.1f}{:8.1f}'    # ti, te
+        '{:14.5e}'          # ne
+        '{:12.3e}'          # PO+
+        '{:12.3e}{:12.3e}'  # PH+, PHe+
+        '{:6d}{:6d}'        # RPA, IDM
+        '{:>20s}'           # date for satellite
+        '{:>10.2f}'         # UT for satellite
+        '{:>10.2f}'         # mlt
+        '{:>10.2f}'         # mlt from IRI
+        '{:>10.3f}'         # UT for Point
+        '{:>20s}'           # date for Point
+        '{:>8.3f}'          # L-Shell
+    )
+
+    HEADER = HEADER_FORMAT.format(
+        'i',
+        'id',
+        'lat', 'lon',
+        'alt',
+        'ti', 'te',
+        'ne',
+        'po+',
+        'ph+', 'phe+',
+        'rpa', 'idm',
+        'date_sat',
+        'ut_sat',
+        'mlt_sat',
+        'mlt_iri',
+        'ut_point',
+        'date_point',
+        'l_shell'
+    )
+
+    # result columns after the row number: name, type, cell format
+    COLUMNS = (
+        ('id', 'U8', '{}'),
+        ('lat', 'f8', '{:.2f}'), ('lon', 'f8', '{:.2f}'),
+        ('alt', 'f8', '{:.2f}'),
+        ('ti', 'f8', '{:.1f}'), ('te', 'f8', '{:.1f}'),
+        ('ne', 'f8', '{:.5e}'),
+        ('po+', 'f8', '{:.3e}'),
+        ('ph+', 'f8', '{:.3e}'), ('phe+', 'f8', '{:.3e}'),
+        ('rpa', 'i8', '{}'), ('idm', 'i8', '{}'),
+        ('date_sat', 'U19', '{}'),
+        ('ut_sat', 'f8', '{:.2f}'),
+        ('mlt_sat', 'f8', '{:.2f}'),
+        ('mlt_iri', 'f8', '{:.2f}'),
+        ('ut_point', 'f8', '{:.3f}'),
+        ('date_point', 'U19', '{}'),
+        ('l_shell', 'f8', '{:.3f}'),
+    )
+
+    PASS_FORMAT = (
+        'Pass {}: {} samples of satellite {} from {} to {}, '
+        'closest approach {:.1f} km at {}.'
+    )
+
+    @staticmethod
+    def row(n, values):
+        return '#{:<5d}'.format(n) + Formats.ROW_FORMAT.format(*values)
+
+    @staticmethod
+    def result_line(n, values):
+        # log rows are marked with '#', result rows are not
+        return '{:<5d} '.format(n) + Formats.ROW_FORMAT.format(*values)
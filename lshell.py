@@ -0,0 +1,236 @@
+from os import path
+import numpy as np
+
+
+class LShellModel:
+
+    RE = 6371.2  # IGRF reference radius, km
+
+    WGS84_A = 6378.137
+    WGS84_F = 1 / 298.257223563
+
+    # Hilton (1971) approximation of the McIlwain L
+    HILTON = (1.35047, 0.465376, 0.0475455)
+
+    # points traced together, the temporaries grow with the degree squared
+    CHUNK_SIZE = 4096
+
+    def __init__(self, filename=None, step=0.02, max_steps=5000):
+        if filename is None:
+            filename = path.join(
+                path.dirname(path.abspath(__file__)), 'data', 'IGRF14.shc')
+
+        self.epochs, self.g, self.h = LShellModel.read_shc(filename)
+        self.nmax = self.g.shape[1] - 1
+        self.step = step
+        self.max_steps = max_steps
+
+        # factors converting Gauss normalized Legendre functions
+        # to the Schmidt semi-normalized ones used by IGRF
+        self.schmidt = np.zeros((self.nmax + 1, self.nmax + 1))
+        self.recursion = np.zeros((self.nmax + 1, self.nmax + 1))
+        self.schmidt[0, 0] = 1.0
+        for n in range(1, self.nmax + 1):
+            for m in range(n - 1):
+                self.recursion[n, m] = ((n - 1)**2 - m**2) / \
+                    ((2*n - 1) * (2*n - 3))
+            self.schmidt[n, 0] = self.schmidt[n-1, 0] * (2*n - 1) / n
+            for m in range(1, n + 1):
+                self.schmidt[n, m] = self.schmidt[n, m-1] * np.sqrt(
+                    (n - m + 1) * (2 if m == 1 else 1) / (n + m))
+
+    @staticmethod
+    def read_shc(filename):
+        with open(filename) as file:
+            lines = [line for line in file
+                     if line.strip() and not line.startswith('#')]
+
+        nmax = int(lines[0].split()[1])
+        epochs = np.array(lines[1].split(), dtype=float)
+
+        g = np.zeros((len(epochs), nmax + 1, nmax + 1))
+        h = np.zeros((len(epochs), nmax + 1, nmax + 1))
+        for line in lines[2:]:
+            values = line.split()
+            n, m = int(values[0]), int(values[1])
+            if m >= 0:
+                g[:, n, m] = np.array(values[2:], dtype=float)
+            else:
+                h[:, n, -m] = np.array(values[2:], dtype=float)
+
+        return epochs, g, h
+
+    @staticmethod
+    def decimal_years(dates):
+        dates = np.asarray(dates, dtype='datetime64[s]')
+        years = dates.astype('datetime64[Y]')
+        start = years.astype('datetime64[s]')
+        end = (years + 1).astype('datetime64[s]')
+        return years.astype(int) + 1970 + (dates - start) / (end - start)
+
+    def coefficients(self, years, nmax=None):
+        # only the terms up to degree nmax are interpolated
+        size = (self.nmax if nmax is None else nmax) + 1
+        years = np.atleast_1d(np.asarray(years, dtype=float))
+        i = np.clip(np.searchsorted(self.epochs, years, side='right') - 1,
+                    0, len(self.epochs) - 2)
+        # after the last epoch the secular variation is extrapolated
+        w = ((years - self.epochs[i]) /
+             (self.epochs[i+1] - self.epochs[i]))[:, None, None]
+        g = self.g[:, :size, :size]
+        h = self.h[:, :size, :size]
+        return (g[i] + w * (g[i+1] - g[i]),
+                h[i] + w * (h[i+1] - h[i]))
+
+    @staticmethod
+    def geodetic_to_cartesian(lats, lons, alts):
+        lat = np.radians(np.asarray(lats, dtype=float))
+        lon = np.radians(np.asarray(lons, dtype=float))
+        alt = np.asarray(alts, dtype=float)
+
+        e2 = LShellModel.WGS84_F * (2 - LShellModel.WGS84_F)
+        n = LShellModel.WGS84_A / np.sqrt(1 - e2 * np.sin(lat)**2)
+        return np.stack([
+            (n + alt) * np.cos(lat) * np.cos(lon),
+            (n + alt) * np.cos(lat) * np.sin(lon),
+            (n * (1 - e2) + alt) * np.sin(lat)]) / LShellModel.RE
+
+    def field(self, xyz, g, h):
+        # g and h are indexed [n, m, point]
+        x, y, z = xyz
+        r = np.sqrt(x**2 + y**2 + z**2)
+        cos_t = z / r
+        sin_t = np.maximum(np.sqrt(x**2 + y**2) / r, 1e-12)
+        phi = np.arctan2(y, x)
+
+        # far from the Earth the high degree terms are negligible
+        nmax = self.nmax
+        while nmax > 1 and np.min(r) ** (1 - nmax) < 1e-3:
+            nmax -= 1
+        size = nmax + 1
+
+        p = np.zeros((size, size, len(r)))
+        dp = np.zeros((size, size, len(r)))
+        p[0, 0] = 1.0
+        for n in range(1, size):
+            p[n, n] = sin_t * p[n-1, n-1]
+            dp[n, n] = sin_t * dp[n-1, n-1] + cos_t * p[n-1, n-1]
+            k = self.recursion[n, :n, None]
+            p[n, :n] = cos_t * p[n-1, :n] - k * p[n-2, :n]
+            dp[n, :n] = cos_t * dp[n-1, :n] - sin_t * p[n-1, :n] \
+                - k * dp[n-2, :n]
+        p *= self.schmidt[:size, :size, None]
+        dp *= self.schmidt[:size, :size, None]
+
+        m = np.arange(size)[:, None]
+        cos_m = np.cos(m * phi)[None]
+        sin_m = np.sin(m * phi)[None]
+        g = g[:size, :size]
+        h = h[:size, :size]
+
+        n = np.arange(size)[:, None, None]
+        factor = (1 / r) ** (n + 2)
+        t = factor * (g * cos_m + h * sin_m)
+
+        b_r = ((n + 1) * t * p).sum(axis=(0, 1))
+        b_t = -(t * dp).sum(axis=(0, 1))
+        b_p = (factor * m[None] * (g * sin_m - h * cos_m) * p).sum(
+            axis=(0, 1)) / sin_t
+
+        b_h = b_r * sin_t + b_t * cos_t
+        return np.stack([
+            b_h * np.cos(phi) - b_p * np.sin(phi),
+            b_h * np.sin(phi) + b_p * np.cos(phi),
+            b_r * cos_t - b_t * sin_t])
+
+    def __direction(self, xyz, g, h, sign):
+        b = self.field(xyz, g, h)
+        return sign * b / np.sqrt((b**2).sum(axis=0))
+
+    def __integral_invariant(self, xyz, g, h):
+        # I = integral of sqrt(1 - B/Bm) ds between the mirror points,
+        # the starting point is one of them
+        npts = xyz.shape[1]
+        b = self.field(xyz, g, h)
+        bm = np.sqrt((b**2).sum(axis=0))
+
+        probe = 1e-3 * b / bm
+        b_plus = np.sqrt((self.field(xyz + probe, g, h)**2).sum(axis=0))
+        b_minus = np.sqrt((self.field(xyz - probe, g, h)**2).sum(axis=0))
+        sign = np.where(b_plus < b_minus, 1.0, -1.0)
+
+        integral = np.zeros(npts)
+        done = np.minimum(b_plus, b_minus) >= bm
+        position = xyz.copy()
+        previous_b = bm.copy()
+        previous_f = np.zeros(npts)
+
+        for _ in range(self.max_steps):
+            active = np.flatnonzero(~done)
+            if not len(active):
+                break
+
+            p = position[:, active]
+            ga, ha, sa = g[:, :, active], h[:, :, active], sign[active]
+            ds = self.step * np.sqrt((p**2).sum(axis=0))
+
+            k1 = self.__direction(p, ga, ha, sa)
+            k2 = self.__direction(p + 0.5 * ds * k1, ga, ha, sa)
+            k3 = self.__direction(p + 0.5 * ds * k2, ga, ha, sa)
+            k4 = self.__direction(p + ds * k3, ga, ha, sa)
+            p = p + ds / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+
+            b = np.sqrt((self.field(p, ga, ha)**2).sum(axis=0))
+            f = np.sqrt(np.maximum(0.0, 1 - b / bm[active]))
+            finished = b >= bm[active]
+
+            # the integrand goes as a square root of the distance to
+            # a mirror point, so the first and the last steps (the last
+            # one ends at the conjugate mirror point) are integrated as such
+            with np.errstate(divide='ignore', invalid='ignore'):
+                fraction = np.clip(
+                    (bm[active] - previous_b[active]) /
+                    (b - previous_b[active]), 0, 1)
+            first = previous_f[active] == 0
+            integral[active] += np.where(
+                finished,
+                2 / 3 * previous_f[active] * fraction * ds,
+                np.where(first, 2 / 3 * f * ds,
+                         0.5 * (previous_f[active] + f) * ds))
+
+            position[:, active] = p
+            previous_b[active] = b
+            previous_f[active] = f
+            done[active[finished]] = True
+
+        integral[~done] = np.nan
+        return integral, bm
+
+    def get_data(self, dates, lats, lons, alts):
+        lats = np.atleast_1d(np.asarray(lats, dtype=float))
+        if not len(lats):
+            return np.empty(0)
+
+        dates = np.broadcast_to(np.atleast_1d(dates), lats.shape)
+        lons = np.broadcast_to(np.asarray(lons, dtype=float), lats.shape)
+        alts = np.broadcast_to(np.asarray(alts, dtype=float), lats.shape)
+        if len(lats) > LShellModel.CHUNK_SIZE:
+            return np.concatenate([
+                self.get_data(dates[a:a + LShellModel.CHUNK_SIZE],
+                              lats[a:a + LShellModel.CHUNK_SIZE],
+                              lons[a:a + LShellModel.CHUNK_SIZE],
+                              alts[a:a + LShellModel.CHUNK_SIZE])
+                for a in range(0, len(lats), LShellModel.CHUNK_SIZE)])
+
+        g, h = self.coefficients(LShellModel.decimal_years(dates))
+        g = np.moveaxis(g, 0, -1)
+        h = np.moveaxis(h, 0, -1)
+        xyz = LShellModel.geodetic_to_cartesian(lats, lons, alts)
+
+        integral, bm = self.__integral_invariant(xyz, g, h)
+
+        moment = np.sqrt(g[1, 0]**2 + g[1, 1]**2 + h[1, 1]**2)
+        x = integral**3 * bm / moment
+        a1, a2, a3 = LShellModel.HILTON
+        return np.cbrt(moment / bm) * np.cbrt(
+            1 + a1 * np.cbrt(x) + a2 * np.cbrt(x)**2 + a3 * x)
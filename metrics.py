@@ -0,0 +1,114 @@
+import json
+import threading
+from time import perf_counter
+from contextlib import contextmanager
+
+
+class RunMetrics:
+
+    # timers and counters shown in the summary, in this order
+    TIMERS = (
+        ('run', 'Run'),
+        ('read', 'Reading'),
+        ('filter', 'Filtering'),
+        ('plan', 'Planning'),
+        ('wait', 'Waiting for models'),
+        ('format', 'Formatting'),
+        ('output', 'Output'),
+        ('iri.request', 'IRI requests'),
+        ('igrf.request', 'L-shell requests'),
+        ('iri.backoff', 'IRI backoff'),
+        ('igrf.backoff', 'L-shell backoff'),
+        ('transport.throttle', 'Rate limit'),
+    )
+
+    COUNTERS = (
+        ('files', 'Files read'),
+        ('rows.read', 'Rows read'),
+        ('rows.kept', 'Rows in the box'),
+        ('rows.output', 'Rows written'),
+        ('lookups.requested', 'Model lookups'),
+        ('lookups.cache', 'Lookups from cache'),
+        ('lookups.remote', 'Remote lookups'),
+        ('iri.retries', 'IRI retries'),
+        ('igrf.retries', 'L-shell retries'),
+        ('iri.errors', 'IRI failed requests'),
+        ('igrf.errors', 'L-shell failed requests'),
+        ('iri.bad_responses', 'IRI bad responses'),
+        ('igrf.bad_responses', 'L-shell bad responses'),
+        ('iri.failed', 'IRI lookups given up'),
+        ('igrf.failed', 'L-shell lookups given up'),
+    )
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timers = dict()
+        self.counters = dict()
+        self.values = dict()
+        self.files = []
+
+    def add(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record(self, name, seconds, count=1):
+        with self.lock:
+            total, n, longest = self.timers.get(name, (0.0, 0, 0.0))
+            self.timers[name] = (total + seconds, n + count,
+                                 max(longest, seconds / max(count, 1)))
+
+    @contextmanager
+    def timer(self, name):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, perf_counter() - start)
+
+    def set(self, name, value):
+        with self.lock:
+            self.values[name] = value
+
+    def add_file(self, filename, statistics):
+        self.record('read', statistics['read'])
+        self.record('filter', statistics['filter'])
+        self.add('files')
+        self.add('rows.read', statistics['rows_read'])
+        self.add('rows.kept', statistics['rows_kept'])
+        with self.lock:
+            self.files.append(dict(statistics, file=filename))
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'timers': {
+                    name: {'seconds': total, 'count': n,
+                           'mean': total / n if n else 0.0, 'max': longest}
+                    for name, (total, n, longest) in self.timers.items()},
+                'counters': dict(self.counters),
+                'values': dict(self.values),
+                'files': list(self.files),
+            }
+
+    def summary(self):
+        metrics = self.to_dict()
+        lines = ['Run metrics:']
+        for name, title in RunMetrics.TIMERS:
+            timer = metrics['timers'].get(name)
+            if timer is None:
+                continue
+            line = '  {}: {:.3f} s'.format(title, timer['seconds'])
+            if timer['count'] > 1:
+                line += ' ({} times, {:.1f} ms mean, {:.1f} ms max)'.format(
+                    timer['count'], 1000 * timer['mean'],
+                    1000 * timer['max'])
+            lines.append(line)
+        for name, title in RunMetrics.COUNTERS:
+            if name in metrics['counters']:
+                lines.append('  {}: {}'.format(
+                    title, metrics['counters'][name]))
+        return lines
+
+    def save(self, filename):
+        with open(filename, 'w') as file:
+            json.dump(self.to_dict(), file, indent=2)
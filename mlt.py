@@ -0,0 +1,114 @@
+import numpy as np
+from lshell import LShellModel
+
+
+class MltModel:
+
+    J2000 = np.datetime64('2000-01-01T12:00:00', 's')
+
+    def __init__(self, igrf=None):
+        self.igrf = igrf if igrf is not None else LShellModel()
+
+    @staticmethod
+    def subsolar_point(dates):
+        # low precision solar coordinates of the Astronomical Almanac
+        dates = np.asarray(dates, dtype='datetime64[s]')
+        n = (dates - MltModel.J2000) / np.timedelta64(86400, 's')
+
+        mean_longitude = np.radians(280.460 + 0.9856474 * n)
+        mean_anomaly = np.radians(357.528 + 0.9856003 * n)
+        ecliptic_longitude = mean_longitude + np.radians(
+            1.915 * np.sin(mean_anomaly) + 0.020 * np.sin(2 * mean_anomaly))
+        obliquity = np.radians(23.439 - 0.0000004 * n)
+
+        right_ascension = np.arctan2(
+            np.cos(obliquity) * np.sin(ecliptic_longitude),
+            np.cos(ecliptic_longitude))
+        declination = np.arcsin(
+            np.sin(obliquity) * np.sin(ecliptic_longitude))
+        sidereal_time = np.radians(
+            280.46061837 + 360.98564736629 * n)
+
+        return np.degrees(declination), \
+            np.degrees(right_ascension - sidereal_time)
+
+    def dipole_pole(self, dates):
+        # the axis of the centered dipole, only the degree 1 terms
+        # of IGRF are interpolated
+        g, h = self.igrf.coefficients(LShellModel.decimal_years(dates), 1)
+        g10, g11, h11 = g[:, 1, 0], g[:, 1, 1], h[:, 1, 1]
+        b0 = np.sqrt(g10**2 + g11**2 + h11**2)
+        return np.arccos(-g10 / b0), np.arctan2(-h11, -g11)
+
+    def magnetic_longitude(self, dates, lats, lons, pole=None):
+        # centered dipole coordinates with the axis taken from IGRF
+        pole_colatitude, pole_longitude = pole if pole is not None \
+            else self.dipole_pole(dates)
+
+        x, y, z = LShellModel.geodetic_to_cartesian(lats, lons, 0.0)
+        cos_p, sin_p = np.cos(pole_longitude), np.sin(pole_longitude)
+        cos_c, sin_c = np.cos(pole_colatitude), np.sin(pole_colatitude)
+        x, y = x * cos_p + y * sin_p, y * cos_p - x * sin_p
+        x = x * cos_c - z * sin_c
+        return np.degrees(np.arctan2(y, x))
+
+    def get_data(self, dates, lats, lons):
+        dates = np.atleast_1d(np.asarray(dates, dtype='datetime64[s]'))
+        lats = np.broadcast_to(np.asarray(lats, dtype=float), dates.shape)
+        lons = np.broadcast_to(np.asarray(lons, dtype=float), dates.shape)
+
+        sun_lat, sun_lon = MltModel.subsolar_point(dates)
+        pole = self.dipole_pole(dates)
+        delta = self.magnetic_longitude(dates, lats, lons, pole) - \
+            self.magnetic_longitude(dates, sun_lat, sun_lon, pole)
+        return np.mod(12.0 + delta / 15.0, 24.0)
+
+    def get_profile(self, date, lat, lon, start=0.0, stop=23.97, step=0.025):
+        # the same hour grid as the all day IRI request
+        hours = np.arange(0, int((stop - start) / step + 1e-9) + 1) * step
+        day = np.datetime64(date, 'D').astype('datetime64[s]')
+        dates = day + np.round((start + hours) * 3600).astype(
+            'timedelta64[s]')
+        return self.get_data(dates, lat, lon)
+
+
+class MltProfileIndex:
+
+    def __init__(self, profile, step=0.025):
+        values = np.asarray(profile, dtype=float)
+        self.order = np.argsort(values, kind='stable')
+        self.values = values[self.order]
+        self.step = step
+
+    def nearest(self, mlts):
+        # the closest profile value on the 24 h circle,
+        # the earliest one of the profile on ties
+        mlts = np.asarray(mlts, dtype=float)
+        n = len(self.values)
+        right = np.searchsorted(self.values, mlts) % n
+        left = np.searchsorted(self.values, self.values[right - 1])
+
+        candidates = np.stack([self.order[left], self.order[right]])
+        distances = np.abs(
+            np.stack([self.values[left], self.values[right]]) - mlts)
+        distances = np.minimum(distances, 24.0 - distances)
+
+        pick = (distances[1] < distances[0]) | (
+            (distances[1] == distances[0]) & (candidates[1] < candidates[0]))
+        return np.where(pick, candidates[1], candidates[0])
+
+    def point_times(self, dates, mlts):
+        # UT of the profile sample closest in MLT and its date,
+        # taken within 12 hours of the satellite date
+        dates = np.asarray(dates, dtype='datetime64[us]')
+        kt = self.nearest(mlts) * self.step
+        date_out = dates.astype('datetime64[D]').astype('datetime64[s]') + \
+            np.trunc(kt * 3600.0).astype(int).astype('timedelta64[s]')
+
+        delta = date_out - dates
+        half_day = np.timedelta64(12, 'h')
+        day = np.timedelta64(1, 'D')
+        date_out = np.where(delta > half_day, date_out - day,
+                            np.where(delta < -half_day, date_out + day,
+                                     date_out))
+        return kt, date_out
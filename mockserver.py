@@ -0,0 +1,134 @@
+import sys
+import argparse
+import threading
+from math import cos, radians
+from time import sleep
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ModelRequestHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        parameters = {key: value[0] for key, value in parse_qs(
+            self.rfile.read(length).decode()).items()}
+
+        if self.server.latency > 0:
+            sleep(self.server.latency)
+        self.server.count(self.path)
+
+        if self.path.endswith('cgm_model.cgi'):
+            body = MockModelServer.cgm_response(parameters)
+        elif parameters.get('model') == 'igrf':
+            body = MockModelServer.igrf_response(parameters)
+        else:
+            body = MockModelServer.iri_response(parameters)
+
+        body = body.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockModelServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0):
+        super().__init__(('127.0.0.1', port), ModelRequestHandler)
+        self.latency = latency
+        self.requests = dict()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def count(self, path):
+        with self.lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    @property
+    def url(self):
+        return 'http://{}:{}'.format(*self.server_address)
+
+    def urls(self):
+        return {
+            'iri_url': self.url + '/cgi-bin/modelweb/models/vitmo_model.cgi',
+            'igrf_url': self.url + '/cgi-bin/modelweb/models/vitmo_model.cgi',
+            'cgm_url': self.url + '/cgi/vitmo/cgm_model.cgi',
+        }
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    @staticmethod
+    def l_value(parameters):
+        lat = float(parameters['latitude'])
+        height = float(parameters['height'])
+        return (1.0 + height / 6371.2) / max(cos(radians(lat)) ** 2, 1e-3)
+
+    @staticmethod
+    def iri_response(parameters):
+        start = float(parameters['start'])
+        stop = float(parameters['stop'])
+        step = float(parameters['step'])
+        longitude = float(parameters['longitude'])
+
+        values = []
+        hour = start
+        while hour <= stop + 1e-9:
+            values.append('{:.2f}'.format((hour + longitude / 15.0) % 24.0))
+            hour += step
+
+        return ('<html><body><pre>\n'
+                'International Reference Ionosphere\n'
+                '     1 \n' + '\n'.join(values) + '\n'
+                '</pre></body></html>')
+
+    @staticmethod
+    def igrf_response(parameters):
+        return ('<html><body><pre>\n'
+                '        1\n'
+                '{:10.3f}\n'
+                '</pre><HR></body></html>'
+                .format(MockModelServer.l_value(parameters)))
+
+    @staticmethod
+    def cgm_response(parameters):
+        return ('<html><body><pre>\n'
+                '      1\n'
+                '{:10.3f}\n'
+                '<hr></pre><HR></body></html>'
+                .format(MockModelServer.l_value(parameters)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Local stand-in for the CCMC/OMNIWeb model services.')
+    parser.add_argument('-p', '--port', type=int, default=8080)
+    parser.add_argument('-l', '--latency', type=float, default=0.0,
+                        help='response delay in seconds')
+    args = parser.parse_args(argv)
+
+    server = MockModelServer(args.port, args.latency)
+    for name, url in server.urls().items():
+        print('{} = {}'.format(name, url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
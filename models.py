@@ -0,0 +1,209 @@
+from cache import ModelCache
+from metrics import RunMetrics
+from retry import RetryScheduler
+from transport import ModelTransport
+
+
+class IriModelAccess:
+    def __init__(self, proxy=None, cache=None, transport=None,
+                 metrics=None, retry=None):
+
+        if proxy is not None:
+            self.proxies = {
+                'https': '{}:{}'.format(
+                    proxy['proxy_host'],
+                    proxy['proxy_port'])
+            }
+
+        self.url = ('https://ccmc.gsfc.nasa.gov'
+                    '/cgi-bin/modelweb/models/vitmo_model.cgi')
+
+        self.cache = cache if cache is not None else ModelCache(
+            table='iri', max_entries=200)
+        self.transport = transport if transport is not None \
+            else ModelTransport()
+        self.metrics = metrics if metrics is not None else RunMetrics()
+        self.retry = retry if retry is not None \
+            else RetryScheduler(metrics=self.metrics)
+
+    @staticmethod
+    def __calc_hash(date, latitude, longitude, all_day):
+        param_hash = '{:04d}-{:02d}-{:02d}_{}_{}_{}'.format(
+            date.year, date.month, date.day, latitude, longitude, all_day)
+        if not all_day:
+            param_hash += '_{:02d}:{:02d}:{:02d}'.format(
+                date.hour, date.minute, date.second)
+        return param_hash
+
+    def get_data_cached(self, date, latitude, longitude, n, all_day=True,
+                        lookup=True, remote=True):
+
+        longitude = float(longitude)
+        if longitude < 0:
+            longitude += 360.0
+
+        param_hash = IriModelAccess.__calc_hash(
+            date, latitude, longitude, all_day)
+        data = self.cache.get(param_hash) if lookup else None
+        if data is None and remote:
+            data = self.get_data(date, latitude, longitude, n, all_day)
+            if data is not None:
+                self.cache.put(param_hash, data)
+        return data
+
+    def get_data(self, date, latitude, longitude, n, all_day=True):
+
+        day = str(date.day)
+        month = str(date.month)
+        year = str(date.year)
+
+        if all_day:
+            start = '0'
+            stop = '23.97'
+        else:
+            start = str(date.hour+date.minute/60.0+date.second/3600.0)
+            stop = start
+
+        step = '0.025'
+
+        longitude = float(longitude)
+        if longitude < 0:
+            longitude += 360.0
+
+        parameters = {
+            'model': 'iri2016',
+            'format': '0',  # 0 - list
+            'year': year,
+            'month': month,
+            'day': day,
+            'time_flag': '0',  # universal
+            'hour': '0',
+            'geo_flag': '0.',  # geographic
+            'latitude': str(latitude),
+            'longitude': str(longitude),
+            'height': '2000',
+            'profile': '8',  # hour profile
+            'start': start,
+            'stop': stop,
+            'step': step,
+            'vars': ['16']  # MLT
+        }
+
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_10_1) '
+                          'AppleWebKit/537.36 (KHTML, like Gecko) '
+                          'Chrome/39.0.2171.95 Safari/537.36'
+        }
+
+        def request():
+            with self.metrics.timer('iri.request'):
+                r = self.transport.post(
+                    self.url,
+                    data=parameters,
+                    proxies=self.proxies if 'proxies' in vars(self) else None,
+                    headers=headers)
+            try:
+                start_pos = r.text.index('     1') + 7
+                end_pos = r.text.index('</pre>')
+            except ValueError:
+                return None
+            return r.text[start_pos: end_pos].strip().split('\n')
+
+        # n is the base of the backoff between attempts
+        return self.retry.call('iri', request, n)
+
+
+class IgrfModelAccess:
+    def __init__(self, proxy=None, cache=None,
+                 resolution=0.0, alt_resolution=0.0, transport=None,
+                 metrics=None, retry=None):
+
+        self.proxies = None
+        if proxy is not None:
+            self.proxies = {
+                'https': '{}:{}'.format(
+                    proxy['proxy_host'],
+                    proxy['proxy_port'])
+            }
+
+        self.url_cgm = ('https://omniweb.gsfc.nasa.gov'
+                        '/cgi/vitmo/cgm_model.cgi')
+
+        self.url_igrf = ('https://ccmc.gsfc.nasa.gov'
+                         '/cgi-bin/modelweb/models/vitmo_model.cgi')
+
+        self.cache = cache if cache is not None else ModelCache(
+            table='igrf', max_entries=200)
+        self.transport = transport if transport is not None \
+            else ModelTransport()
+        self.metrics = metrics if metrics is not None else RunMetrics()
+        self.retry = retry if retry is not None \
+            else RetryScheduler(metrics=self.metrics)
+        self.resolution = resolution
+        self.alt_resolution = alt_resolution
+
+    @staticmethod
+    def quantize(value, resolution):
+        if resolution <= 0:
+            return float(value)
+        return round(float(round(value / resolution) * resolution), 6)
+
+    def get_data_cached(self, year, lat, lon, height, n=1, cgm=False,
+                        lookup=True, remote=True):
+
+        # nearby points share the value computed for the cell center
+        lat = IgrfModelAccess.quantize(lat, self.resolution)
+        lon = IgrfModelAccess.quantize(lon, self.resolution)
+        height = IgrfModelAccess.quantize(height, self.alt_resolution)
+
+        param_hash = '{}_{}_{}_{}_{}'.format(
+            year, 'cgm' if cgm else 'igrf', lat, lon, height)
+        data = self.cache.get(param_hash) if lookup else None
+        if data is None and remote:
+            data = self.get_data(year, lat, lon, height, n, cgm)
+            if data is not None:
+                self.cache.put(param_hash, data)
+        return data
+
+    def get_data(self, year, lat, lon, height, n=1, cgm=False):
+
+        parameters = {
+            'model': 'cgm' if cgm else 'igrf',
+            'format': '0',  # 0 - list
+            'year': str(year),
+            'height': height,
+            'latitude': lat,
+            'longitude': lon,
+            'profile': '1' if cgm else '3',  # Height profile
+            'start': '{:.1f}'.format(height),
+            'stop': '{:.1f}'.format(height),
+            'step': '{:.1f}'.format(10.0),
+            'vars': ['42'] if cgm else ['12']  # L_value
+        }
+
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_10_1) '
+                          'AppleWebKit/537.36 (KHTML, like Gecko) '
+                          'Chrome/39.0.2171.95 Safari/537.36'
+        }
+
+        def request():
+            with self.metrics.timer('igrf.request'):
+                r = self.transport.post(
+                    self.url_cgm if cgm else self.url_igrf,
+                    data=parameters,
+                    proxies=self.proxies,
+                    headers=headers)
+            try:
+                start_pos = (r.text.index('      1') +
+                             7) if cgm else (r.text.index('        1') + 9)
+                end_pos = r.text.index(
+                    '<hr></pre><HR>') if cgm else r.text.index('</pre><HR>')
+            except ValueError:
+                return None
+            lines = r.text[start_pos: end_pos].strip()
+            values = [[float(x) for x in line.split()]
+                      for line in lines.split('\n')]
+            return values[0]
+
+        return self.retry.call('igrf', request, n)
@@ -0,0 +1,49 @@
+import numpy as np
+
+
+class PassSegmenter:
+
+    EARTH_RADIUS = 6371.0  # km
+
+    @staticmethod
+    def split(data, gap=600.0):
+        # samples of one overpass are consecutive in time, a new pass
+        # starts when the satellite changes or after a gap in the samples
+        if not len(data):
+            return []
+
+        order = np.lexsort((data['date'], data['sat_id']))
+        dates = data['date'][order]
+        sat_ids = data['sat_id'][order]
+
+        gaps = np.diff(dates) > np.timedelta64(int(gap * 1e6), 'us')
+        breaks = np.flatnonzero(gaps | (sat_ids[1:] != sat_ids[:-1])) + 1
+        return np.split(order, breaks)
+
+    @staticmethod
+    def distance(lats, lons, lat, lon):
+        lat1 = np.radians(np.asarray(lats, dtype=float))
+        lon1 = np.radians(np.asarray(lons, dtype=float))
+        lat2, lon2 = np.radians(lat), np.radians(lon)
+
+        a = np.sin((lat2 - lat1) / 2)**2 + \
+            np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2)**2
+        return 2 * PassSegmenter.EARTH_RADIUS * np.arcsin(
+            np.sqrt(np.clip(a, 0, 1)))
+
+    @staticmethod
+    def summary(data, index, configuration):
+        distances = PassSegmenter.distance(
+            data['lat'][index], data['long'][index],
+            configuration['point_lat'], configuration['point_long'])
+        k = int(np.argmin(distances))
+        dates = data['date'][index]
+
+        return {
+            'sat_id': str(data['sat_id'][index[0]]),
+            'entry': dates.min().item(),
+            'exit': dates.max().item(),
+            'count': len(index),
+            'closest': int(index[k]),
+            'distance': float(distances[k]),
+        }
@@ -0,0 +1,83 @@
+import numpy as np
+
+
+class PassFilter:
+
+    @staticmethod
+    def bounds(configuration):
+        sat_lat = configuration['dmsp_lat']
+        sat_lon = configuration['dmsp_long']
+        sat_dlat = configuration['dmsp_dlat']
+        sat_dlon = configuration['dmsp_dlong']
+
+        lat_m = sat_lat - sat_dlat
+        lat_m = -90 if lat_m < -90 else lat_m
+        lat_p = sat_lat + sat_dlat
+        lat_p = 90 if lat_p > 90 else lat_p
+
+        lon_m = sat_lon - sat_dlon
+        lon_m += 360 if lon_m < -180 else 0
+
+        lon_p = sat_lon + sat_dlon
+        lon_p -= 360 if lon_p > 180 else 0
+
+        if lon_p-lon_m == 2*sat_dlon:
+            lon_ranges = [(lon_m, lon_p)]
+        elif sat_dlon == 180:
+            lon_ranges = [(-180, 180)]
+        else:
+            # the box crosses the antimeridian
+            lon_ranges = [(-180, lon_p), (lon_m, 180)]
+
+        return (lat_m, lat_p), lon_ranges
+
+    @staticmethod
+    def masks(lats, lons, boxes):
+        # one row per box, all boxes are tested in a single broadcast
+        bounds = [PassFilter.bounds(box) for box in boxes]
+        lat_m = np.array([lat[0] for lat, _ in bounds])[:, None]
+        lat_p = np.array([lat[1] for lat, _ in bounds])[:, None]
+
+        # boxes have one or two longitude ranges, the missing one is empty
+        lon_min = np.full((len(boxes), 2, 1), np.inf)
+        lon_max = np.full((len(boxes), 2, 1), -np.inf)
+        for i, (_, lon_ranges) in enumerate(bounds):
+            for j, (a, b) in enumerate(lon_ranges):
+                lon_min[i, j] = a
+                lon_max[i, j] = b
+
+        lats = np.asarray(lats, dtype=float)[None, :]
+        lons = np.asarray(lons, dtype=float)[None, None, :]
+        lon_check = ((lons >= lon_min) & (lons <= lon_max)).any(axis=1)
+        return (lats >= lat_m) & (lats <= lat_p) & lon_check
+
+    @staticmethod
+    def mask(lats, lons, configuration):
+        if configuration.get('targets'):
+            return PassFilter.masks(
+                lats, lons, configuration['targets']).any(axis=0)
+
+        (lat_m, lat_p), lon_ranges = PassFilter.bounds(configuration)
+
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+
+        lon_check = np.zeros(lons.shape, dtype=bool)
+        for lon_min, lon_max in lon_ranges:
+            lon_check |= (lons >= lon_min) & (lons <= lon_max)
+
+        return (lats >= lat_m) & (lats <= lat_p) & lon_check
+
+    @staticmethod
+    def indices(lats, lons, configuration):
+        return np.flatnonzero(PassFilter.mask(lats, lons, configuration))
+
+    @staticmethod
+    def ranges(indices):
+        indices = np.asarray(indices)
+        if not len(indices):
+            return []
+        breaks = np.flatnonzero(np.diff(indices) != 1) + 1
+        starts = indices[np.r_[0, breaks]]
+        stops = indices[np.r_[breaks - 1, len(indices) - 1]] + 1
+        return list(zip(starts.tolist(), stops.tolist()))
@@ -0,0 +1,79 @@
+import threading
+from queue import Queue, Empty, Full
+from collections import deque
+
+
+class Pipeline:
+
+    POLL_INTERVAL = 0.1  # s
+
+    @staticmethod
+    def stage(iterable, size, token):
+        # the items are produced by a thread of their own and handed over
+        # through a queue of at most size items, so the producer runs
+        # ahead of the consumer but never more than size items
+        if size < 1:
+            yield from iterable
+            return
+
+        queue = Queue(size)
+        stop = threading.Event()
+        done = object()
+
+        def put(item):
+            while not stop.is_set() and not token.cancelled:
+                try:
+                    queue.put(item, timeout=Pipeline.POLL_INTERVAL)
+                    return True
+                except Full:
+                    pass
+            return False
+
+        def produce():
+            iterator = iter(iterable)
+            try:
+                for item in iterator:
+                    if not put((item, None)):
+                        return
+                put((done, None))
+            except BaseException as error:
+                put((done, error))
+            finally:
+                if hasattr(iterator, 'close'):
+                    iterator.close()
+
+        thread = threading.Thread(target=produce, daemon=True)
+        thread.start()
+        try:
+            while True:
+                try:
+                    item, error = queue.get(timeout=Pipeline.POLL_INTERVAL)
+                except Empty:
+                    if token.cancelled or \
+                            not thread.is_alive() and queue.empty():
+                        return
+                    continue
+                if error is not None:
+                    raise error
+                if item is done:
+                    return
+                yield item
+        finally:
+            stop.set()
+            thread.join()
+
+    @staticmethod
+    def bounded_map(executor, function, size, *iterables):
+        # like executor.map, but at most size calls are submitted ahead
+        # of the results taken so far
+        pending = deque()
+        try:
+            for args in zip(*iterables):
+                pending.append(executor.submit(function, *args))
+                if len(pending) >= size:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,77 @@
+from concurrent.futures import Future
+
+
+class QueryPlanner:
+
+    def __init__(self, transport, in_flight=None):
+        self.transport = transport
+        self.in_flight = in_flight if in_flight is not None else dict()
+        self.queries = dict()
+        self.requested = 0
+        self.hits = 0
+        self.shared = 0
+        self.remote = []
+
+    def add(self, function, *args):
+        # every lookup of the plan gets the future of its unique query
+        self.requested += 1
+        key = (function,) + args
+        if key not in self.queries:
+            self.queries[key] = Future()
+        return self.queries[key]
+
+    @property
+    def saved(self):
+        return self.requested - len(self.queries)
+
+    def resolve(self):
+        pending = []
+        for key, future in self.queries.items():
+            if future.done():
+                continue
+
+            # a lookup still in flight for an earlier plan is shared; it is
+            # looked up before the cache, which gets the value first
+            request = self.in_flight.get(key)
+            if request is not None:
+                request.add_done_callback(QueryPlanner.__forward(future))
+                self.shared += 1
+                continue
+
+            function, args = key[0], key[1:]
+            value = function(*args, remote=False)
+            if value is not None:
+                future.set_result(value)
+                self.hits += 1
+            else:
+                pending.append((key, future))
+
+        # the cache misses go to the models all at once
+        for key, future in pending:
+            request = self.transport.submit(key[0], *key[1:], lookup=False)
+            self.in_flight[key] = request
+            request.add_done_callback(QueryPlanner.__forward(future))
+            request.add_done_callback(
+                lambda _, key=key: self.in_flight.pop(key, None))
+            self.remote.append(request)
+
+        return self.hits, len(self.remote) + self.shared
+
+    @staticmethod
+    def __forward(future):
+        def callback(request):
+            if future.done():
+                return
+            if request.cancelled():
+                future.cancel()
+            elif request.exception() is not None:
+                future.set_exception(request.exception())
+            else:
+                future.set_result(request.result())
+        return callback
+
+    def cancel(self):
+        for request in self.remote:
+            request.cancel()
+        for future in self.queries.values():
+            future.cancel()
@@ -0,0 +1,423 @@
+import os
+from os import path
+import gzip
+from itertools import islice
+import numpy as np
+from cdflib import CDF, cdfepoch
+from records import RecordBatch
+from passfilter import PassFilter
+import warnings
+with warnings.catch_warnings():
+    warnings.filterwarnings('ignore', category=FutureWarning)
+    import h5py
+
+
+class DataReader:
+
+    CHUNK_SIZE = 65536
+    CDF_EPOCH_1970 = 62167219200000.0
+
+    __cdf_inventory = dict()
+
+    @staticmethod
+    def read(filename, te_name='Te_hgn', box=None, rows=None, window=None):
+        # rows are sorted (start, stop) ranges of the file rows to read,
+        # window is a (start, end) time range, either side may be None
+        if rows is not None and not rows:
+            return RecordBatch.create(0, [], [])
+        if window is not None and window[0] is None and window[1] is None:
+            window = None
+        if filename.endswith('.hdf5'):
+            return DataReader.__read_hdf5_file(filename, box, rows, window)
+        elif filename.endswith('.txt') or filename.endswith('.txt.gz'):
+            return DataReader.__read_txt_file(filename, box, rows, window)
+        elif filename.endswith('.cdf'):
+            return DataReader.__read_cdf_file(
+                filename, te_name, box, rows, window)
+
+    @staticmethod
+    def coordinates(filename, te_name='Te_hgn'):
+        # only the time, position and satellite of every row, for the
+        # indexes; the text rows are parsed whole in any case
+        if filename.endswith('.hdf5'):
+            return DataReader.__read_hdf5_coordinates(filename)
+        elif filename.endswith('.cdf'):
+            return DataReader.__read_cdf_coordinates(filename)
+        data = DataReader.read(filename, te_name)
+        if data is None:
+            return None
+        return RecordBatch.create(len(data), data['date'], data['sat_id'],
+                                  lat=data['lat'], long=data['long'])
+
+    @staticmethod
+    def __bisect(nrows, date_at, value):
+        lo, hi = 0, nrows
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if date_at(mid) < value:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    @staticmethod
+    def __window_rows(nrows, date_at, window, rows=None):
+        # the files are in time order, so the window is found by binary
+        # search reading a few rows, not the whole time column
+        start, end = window
+        lo = 0 if start is None else \
+            DataReader.__bisect(nrows, date_at, start)
+        hi = nrows if end is None else \
+            DataReader.__bisect(nrows, date_at, end)
+        return DataReader.__clip(rows, nrows, lo, hi)
+
+    @staticmethod
+    def __clip(rows, nrows, lo, hi):
+        return [(max(a, lo), min(b, hi))
+                for a, b in (rows if rows is not None else [(0, nrows)])
+                if max(a, lo) < min(b, hi)]
+
+    @staticmethod
+    def __chunks(ranges):
+        for start, stop in ranges:
+            for a in range(start, stop, DataReader.CHUNK_SIZE):
+                yield a, min(a + DataReader.CHUNK_SIZE, stop)
+
+    @staticmethod
+    def __dmsp_sat_id(filename):
+        basename = path.basename(filename)
+        return basename[16:18] if basename.startswith('dms_ut_') else -1
+
+    @staticmethod
+    def __hdf5_sat_ids(filename, table):
+        if 'sat_id' not in table.dtype.fields:
+            return DataReader.__dmsp_sat_id(filename)
+        sat_ids = table['sat_id']
+        return np.where(np.isnan(sat_ids), -1, sat_ids).astype(int)
+
+    @staticmethod
+    def __read_hdf5_coordinates(filename):
+        with h5py.File(filename, 'r') as file:
+            main_table = file['Data/Table Layout']
+            names = [name for name in ('year', 'month', 'day', 'hour',
+                                       'min', 'sec', 'gdlat', 'glon',
+                                       'sat_id')
+                     if name in main_table.dtype.fields]
+            table = main_table.fields(names)[:]
+
+        dates = RecordBatch.make_dates(
+            table['year'], table['month'], table['day'],
+            table['hour'], table['min'], table['sec'])
+        return RecordBatch.create(
+            len(table), dates, DataReader.__hdf5_sat_ids(filename, table),
+            lat=table['gdlat'], long=table['glon'])
+
+    @staticmethod
+    def __read_hdf5_file(filename, box=None, rows=None, window=None):
+
+        with h5py.File(filename, 'r') as file:
+            main_table = file['Data/Table Layout']
+            columns = main_table.dtype.fields.keys()
+            nrows = len(main_table)
+            if window is not None:
+                def date_at(i):
+                    row = main_table[i]
+                    return RecordBatch.make_dates(
+                        row['year'], row['month'], row['day'],
+                        row['hour'], row['min'], row['sec'])
+                rows = DataReader.__window_rows(
+                    nrows, date_at, window, rows)
+            if rows is None:
+                rows = [(0, nrows)]
+
+            # only coordinates are read for the whole file, the remaining
+            # fields are fetched for the rows inside the box
+            indices = []
+            scanned = 0
+            for start, stop in DataReader.__chunks(rows):
+                stop = min(stop, nrows)
+                if start >= stop:
+                    continue
+                scanned += stop - start
+                if box is None:
+                    indices.append(np.arange(start, stop))
+                else:
+                    mask = PassFilter.mask(
+                        main_table[start:stop, 'gdlat'],
+                        main_table[start:stop, 'glon'],
+                        box)
+                    indices.append(start + np.flatnonzero(mask))
+
+            tables = [main_table[a:b] for a, b in PassFilter.ranges(
+                np.concatenate(indices) if indices else [])]
+            table = np.concatenate(tables) if tables else main_table[0:0]
+
+        def column(*names):
+            for name in names:
+                if name in columns:
+                    return table[name]
+            return None
+
+        dates = RecordBatch.make_dates(
+            table['year'],
+            table['month'],
+            table['day'],
+            table['hour'],
+            table['min'],
+            table['sec'])
+
+        batch = RecordBatch.create(
+            len(table), dates, DataReader.__hdf5_sat_ids(filename, table),
+            lat=column('gdlat'),
+            long=column('glon'),
+            alt=column('gdalt'),
+            ti=column('ti'),
+            te=column('te'),
+            ne=column('ne', 'ni'),
+            mlt=column('mlt'),
+            po=column('po+'),
+            ph=column('ph+'),
+            phe=column('phe+'),
+            rpa=column('rpa_flag_ut'),
+            idm=column('idm_flag_ut'))
+        batch.scanned = scanned
+        return batch
+
+    @staticmethod
+    def __parse_lines(lines, ncols):
+        try:
+            table = np.loadtxt(lines, ndmin=2)
+            if table.shape[1] == ncols:
+                return table
+        except ValueError:
+            pass
+
+        # slow path for blocks with missing or non-numeric values
+        table = np.full((len(lines), ncols), np.nan)
+        for i, line in enumerate(lines):
+            for j, value in enumerate(line.split()[:ncols]):
+                try:
+                    table[i, j] = float(value)
+                except ValueError:
+                    pass
+        return table
+
+    @staticmethod
+    def __read_txt_file(filename, box=None, rows=None, window=None):
+
+        if filename.endswith('.txt.gz'):
+            file = gzip.open(filename, 'rt')
+        elif filename.endswith('.txt'):
+            file = open(filename, 'r')
+        else:
+            return RecordBatch.create(0, [], [])
+
+        with file:
+            header = file.readline().split()
+
+            try:
+                date_pos = [header.index(name) for name in
+                            ('YEAR', 'MONTH', 'DAY', 'HOUR', 'MIN', 'SEC')]
+            except ValueError:
+                return None
+
+            def pos_normalize(name):
+                try:
+                    pos = header.index(name)
+                except ValueError:
+                    pos = -1
+                return pos
+
+            params = {
+                'ti': pos_normalize('TI'),
+                'te': pos_normalize('TE'),
+                'ne': pos_normalize('NE'),
+                'mlt': pos_normalize('MLT'),
+                'alt': pos_normalize('GDALT'),
+                'po': pos_normalize('PO+'),
+                'ph': pos_normalize('PH+'),
+                'phe': pos_normalize('PHE+'),
+                'rpa': pos_normalize('RPA_FLAG_'),
+                'idm': pos_normalize('IDM_FLAG_'),
+            }
+            if params['ne'] == -1:
+                params['ne'] = pos_normalize('NI')
+            lat_pos = pos_normalize('GDLAT')
+            long_pos = pos_normalize('GLON')
+            sat_id_pos = pos_normalize('SAT_ID')
+
+            def line_date(line):
+                values = line.split()
+                return RecordBatch.make_dates(
+                    *[float(values[pos]) for pos in date_pos])
+
+            ncols = None
+            tables = []
+            scanned = 0
+            row = 0
+            last_row = rows[-1][1] if rows else None
+
+            while last_row is None or row < last_row:
+                lines = [line for line in islice(file, DataReader.CHUNK_SIZE)
+                         if line.strip()]
+                if not lines:
+                    break
+                if window is not None:
+                    # blocks are time ordered too, so a block ending before
+                    # the window is never parsed and one starting after it
+                    # ends the reading
+                    if window[0] is not None and \
+                            line_date(lines[-1]) < window[0]:
+                        row += len(lines)
+                        continue
+                    if window[1] is not None and \
+                            line_date(lines[0]) >= window[1]:
+                        break
+                if rows is not None:
+                    # only the requested rows of the block are parsed
+                    numbers = np.arange(row, row + len(lines))
+                    row += len(lines)
+                    selected = np.zeros(len(lines), dtype=bool)
+                    for start, stop in rows:
+                        selected |= (numbers >= start) & (numbers < stop)
+                    lines = [lines[i] for i in np.flatnonzero(selected)]
+                    if not lines:
+                        continue
+
+                if ncols is None:
+                    ncols = len(lines[0].split())
+                    # adjacent columns may be merged in the exported rows
+                    if len(header) > ncols:
+                        lat_pos -= 1
+                        long_pos -= 1
+                        sat_id_pos -= 1
+                        params = {name: pos - 1
+                                  for name, pos in params.items()}
+
+                table = DataReader.__parse_lines(lines, ncols)
+                if window is not None:
+                    table = table[RecordBatch.window(
+                        RecordBatch.make_dates(
+                            *[table[:, pos] for pos in date_pos]),
+                        *window)]
+                scanned += len(table)
+                if box is not None:
+                    table = table[PassFilter.mask(
+                        table[:, lat_pos], table[:, long_pos], box)]
+                tables.append(table)
+
+        table = np.concatenate(tables) if tables else np.empty((0, 0))
+        nrows = len(table)
+        if not nrows:
+            batch = RecordBatch.create(0, [], [])
+            batch.scanned = scanned
+            return batch
+
+        dates = RecordBatch.make_dates(*[table[:, pos] for pos in date_pos])
+
+        if sat_id_pos > 0:
+            sat_ids = table[:, sat_id_pos]
+            sat_ids = np.where(np.isnan(sat_ids), -1, sat_ids).astype(int)
+        else:
+            sat_ids = DataReader.__dmsp_sat_id(filename)
+
+        batch = RecordBatch.create(
+            nrows, dates, sat_ids,
+            lat=table[:, lat_pos],
+            long=table[:, long_pos],
+            **{name: table[:, pos] if pos > 0 else None
+               for name, pos in params.items()})
+        batch.scanned = scanned
+        return batch
+
+    @staticmethod
+    def __cdf_variables(filename, cdf):
+        stat = os.stat(filename)
+        key = (path.abspath(filename), stat.st_mtime, stat.st_size)
+        if key not in DataReader.__cdf_inventory:
+            info = cdf.cdf_info()
+            DataReader.__cdf_inventory[key] = set(
+                info['zVariables'] if isinstance(info, dict)
+                else info.zVariables)
+        return DataReader.__cdf_inventory[key]
+
+    @staticmethod
+    def __cdf_dates(timestamps):
+        timestamps = np.atleast_1d(timestamps)
+        if timestamps.dtype == np.float64:
+            # CDF_EPOCH, milliseconds since 0000-01-01
+            microseconds = (timestamps - DataReader.CDF_EPOCH_1970) * 1e3
+        else:
+            microseconds = np.asarray(
+                cdfepoch.unixtime(timestamps), dtype=float) * 1e6
+        return np.round(microseconds).astype('int64').astype('datetime64[us]')
+
+    @staticmethod
+    def __cdf_sat_id(filename):
+        basename = path.basename(filename)
+        return basename[11:12] if basename.startswith('SW_EXTD_EFI') else -1
+
+    @staticmethod
+    def __read_cdf_coordinates(filename):
+        cdf = CDF(filename)
+        latitudes = np.atleast_1d(cdf.varget('Latitude'))
+        return RecordBatch.create(
+            len(latitudes),
+            DataReader.__cdf_dates(cdf.varget('Timestamp')),
+            DataReader.__cdf_sat_id(filename),
+            lat=latitudes,
+            long=np.atleast_1d(cdf.varget('Longitude')))
+
+    @staticmethod
+    def __read_cdf_file(filename, te_name, box=None, rows=None,
+                        window=None):
+
+        ne_name = 'Density'
+        cdf = CDF(filename)
+        variables = DataReader.__cdf_variables(filename, cdf)
+
+        if window is not None:
+            # a compressed variable is inflated as a whole on every read,
+            # so the time column is read once and searched in memory
+            dates = DataReader.__cdf_dates(cdf.varget('Timestamp'))
+            index = RecordBatch.window(dates, *window)
+            rows = DataReader.__clip(
+                rows, len(dates), index.start, index.stop)
+
+        if rows is None:
+            latitudes = np.atleast_1d(cdf.varget('Latitude'))
+            longitudes = np.atleast_1d(cdf.varget('Longitude'))
+            numbers = np.arange(len(latitudes))
+        else:
+            def part(name, a, b):
+                return np.atleast_1d(cdf.varget(name, startrec=a, endrec=b-1))
+            latitudes = np.concatenate(
+                [part('Latitude', a, b) for a, b in rows] + [np.empty(0)])
+            longitudes = np.concatenate(
+                [part('Longitude', a, b) for a, b in rows] + [np.empty(0)])
+            numbers = np.concatenate(
+                [np.arange(a, b) for a, b in rows] + [np.empty(0, int)])
+
+        if box is None:
+            selected = np.arange(len(latitudes))
+        else:
+            selected = PassFilter.indices(latitudes, longitudes, box)
+        ranges = PassFilter.ranges(numbers[selected])
+
+        def column(name):
+            if name not in variables:
+                return None
+            parts = [np.atleast_1d(cdf.varget(name, startrec=a, endrec=b-1))
+                     for a, b in ranges]
+            return np.concatenate(parts) if parts else np.empty(0)
+
+        batch = RecordBatch.create(
+            len(selected), DataReader.__cdf_dates(column('Timestamp')),
+            DataReader.__cdf_sat_id(filename),
+            lat=latitudes[selected],
+            long=longitudes[selected],
+            alt=column('Height'),
+            ne=column(ne_name),
+            te=column(te_name))
+        batch.scanned = len(latitudes)
+        return batch
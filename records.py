@@ -0,0 +1,89 @@
+import numpy as np
+
+
+class RecordBatch:
+
+    FLOAT_FIELDS = ('ti', 'te', 'ne', 'lat', 'long', 'alt',
+                    'mlt', 'po', 'ph', 'phe')
+    INT_FIELDS = ('rpa', 'idm')
+
+    def __init__(self, columns, scanned=None):
+        self.columns = columns
+        # rows the reader went through before any box or window was applied
+        self.scanned = len(self) if scanned is None else scanned
+
+    def __len__(self):
+        return len(self.columns['date'])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def select(self, index):
+        return RecordBatch(
+            {name: column[index] for name, column in self.columns.items()})
+
+    def rows(self):
+        columns = {name: column.tolist()
+                   for name, column in self.columns.items()}
+        for i in range(len(self)):
+            yield {name: column[i] for name, column in columns.items()}
+
+    @staticmethod
+    def create(nrows, dates, sat_ids, **fields):
+        columns = {'date': np.asarray(dates, dtype='datetime64[us]')}
+
+        if np.ndim(sat_ids) == 0:
+            sat_ids = np.full(nrows, str(sat_ids))
+        columns['sat_id'] = np.asarray(sat_ids).astype(str)
+
+        for name in RecordBatch.FLOAT_FIELDS + RecordBatch.INT_FIELDS:
+            column = fields.get(name)
+            if column is None:
+                column = np.full(nrows, -1.0)
+            column = np.asarray(column, dtype=float)
+            if name not in ('lat', 'long'):
+                column = np.where(np.isnan(column), -1.0, column)
+            columns[name] = column.astype(
+                int if name in RecordBatch.INT_FIELDS else float)
+
+        return RecordBatch(columns)
+
+    @staticmethod
+    def concatenate(batches):
+        batches = [b for b in batches if b is not None]
+        if not batches:
+            return RecordBatch.create(0, [], [])
+        return RecordBatch(
+            {name: np.concatenate([b.columns[name] for b in batches])
+             for name in batches[0].columns})
+
+    @staticmethod
+    def window(dates, start=None, end=None):
+        # dates are sorted, so the rows from start up to, not including,
+        # end are a slice found by binary search
+        lo = 0 if start is None else \
+            np.searchsorted(dates, np.datetime64(start, 'us'), 'left')
+        hi = len(dates) if end is None else \
+            np.searchsorted(dates, np.datetime64(end, 'us'), 'left')
+        return slice(int(lo), int(max(lo, hi)))
+
+    @staticmethod
+    def ut_hours(dates):
+        # the same sum as hour + minute / 60 + second / 3600 of every date
+        seconds = (dates.astype('datetime64[s]') -
+                   dates.astype('datetime64[D]')).astype('int64')
+        return seconds // 3600 + seconds // 60 % 60 / 60.0 + \
+            seconds % 60 / 3600.0
+
+    @staticmethod
+    def make_dates(years, months, days, hours, mins, secs):
+        years = np.asarray(years, dtype=int)
+        dates = (years - 1970).astype('datetime64[Y]')
+        dates = dates.astype('datetime64[M]') + \
+            (np.asarray(months, dtype=int) - 1).astype('timedelta64[M]')
+        dates = dates.astype('datetime64[D]') + \
+            (np.asarray(days, dtype=int) - 1).astype('timedelta64[D]')
+        return dates.astype('datetime64[us]') + \
+            np.asarray(hours, dtype=int).astype('timedelta64[h]') + \
+            np.asarray(mins, dtype=int).astype('timedelta64[m]') + \
+            np.asarray(secs, dtype=int).astype('timedelta64[s]')
@@ -0,0 +1,82 @@
+import numpy as np
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from formats import Formats
+
+
+class ResultTableModel(QAbstractTableModel):
+
+    # every row keeps the name of its target after the result columns
+    DTYPE = np.dtype([(name, dtype) for name, dtype, _ in Formats.COLUMNS] +
+                     [('target', 'U64')])
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.buffer = np.zeros(1024, dtype=ResultTableModel.DTYPE)
+        self.count = 0
+        self.targets = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.count
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(Formats.COLUMNS) + (1 if self.targets else 0)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            # with targets the first column is the target name
+            column = index.column()
+            if self.targets:
+                if not column:
+                    return self.buffer[index.row()]['target']
+                column -= 1
+            _, _, cell = Formats.COLUMNS[column]
+            return cell.format(self.buffer[index.row()][column])
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            if self.targets:
+                if not section:
+                    return 'target'
+                section -= 1
+            return Formats.COLUMNS[section][0]
+        return str(section + 1)
+
+    def append(self, rows):
+        if not rows:
+            return
+
+        size = self.count + len(rows)
+        if size > len(self.buffer):
+            # the buffer grows geometrically, rows are never moved one by one
+            buffer = np.zeros(max(size, 2 * len(self.buffer)),
+                              dtype=ResultTableModel.DTYPE)
+            buffer[:self.count] = self.buffer[:self.count]
+            self.buffer = buffer
+
+        self.beginInsertRows(QModelIndex(), self.count, size - 1)
+        self.buffer[self.count:size] = rows
+        self.count = size
+        self.endInsertRows()
+
+    def clear(self, targets=None):
+        self.beginResetModel()
+        self.buffer = np.zeros(1024, dtype=ResultTableModel.DTYPE)
+        self.count = 0
+        self.targets = list(targets or [])
+        self.endResetModel()
+
+    def rows(self, target=None):
+        rows = self.buffer[:self.count]
+        if target is not None:
+            rows = rows[rows['target'] == target]
+        for row in rows.tolist():
+            yield row[:-1]
@@ -0,0 +1,77 @@
+import random
+import threading
+from time import monotonic
+import requests
+from metrics import RunMetrics
+
+
+class Cancelled(Exception):
+    pass
+
+
+class CancellationToken:
+
+    def __init__(self):
+        self.event = threading.Event()
+
+    def cancel(self):
+        self.event.set()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def check(self):
+        if self.event.is_set():
+            raise Cancelled()
+
+    def wait(self, seconds):
+        # returns early, raising Cancelled, as soon as the token is cancelled
+        if self.event.wait(max(seconds, 0)):
+            raise Cancelled()
+
+
+class RetryScheduler:
+
+    def __init__(self, token=None, attempts=7, max_delay=64.0,
+                 deadline=300.0, metrics=None):
+        self.token = token if token is not None else CancellationToken()
+        self.attempts = attempts
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.metrics = metrics if metrics is not None else RunMetrics()
+
+    def delay(self, attempt, base=1.0):
+        # doubling backoff with jitter, so parallel lookups failing
+        # together do not all come back at the same moment
+        delay = min(self.max_delay, base * 2 ** (attempt + 1))
+        return random.uniform(delay / 2, delay)
+
+    def call(self, name, function, base=1.0):
+        # the first attempt goes out at once; a failed request or a bad
+        # response (None) is retried until the attempts or the deadline
+        # run out, and then None is returned
+        start = monotonic()
+        for attempt in range(self.attempts):
+            self.token.check()
+            try:
+                result = function()
+            except requests.exceptions.RequestException:
+                self.metrics.add(name + '.errors')
+            else:
+                if result is not None:
+                    return result
+                self.metrics.add(name + '.bad_responses')
+
+            if attempt + 1 == self.attempts:
+                break
+            delay = self.delay(attempt, base)
+            if self.deadline and monotonic() - start + delay > self.deadline:
+                break
+
+            self.metrics.add(name + '.retries')
+            with self.metrics.timer(name + '.backoff'):
+                self.token.wait(delay)
+
+        self.metrics.add(name + '.failed')
+        return None
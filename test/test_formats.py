@@ -0,0 +1,57 @@
+import os
+import sys
+import tempfile
+import unittest
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from formats import Formats  # noqa: E402
+from writers import TextResultWriter  # noqa: E402
+
+
+VALUES = ('F13', 45.12, -120.5, 840.0, 1500.2, 2500.7, 1.23456e10,
+          5.5e9, 1.1e8, 2.2e7, 1, 2, '2001-10-16 12:34:56', 12.58,
+          3.25, 3.3, 12.625, '2001-10-16 12:37:30', 5.243)
+
+
+class FormatsTest(unittest.TestCase):
+
+    def test_result_line(self):
+        tail = Formats.result_line(1, VALUES).split()[1:]
+        for n in (1, 99999, 100000, 123456, 10000000):
+            fields = Formats.result_line(n, VALUES).split()
+            self.assertEqual(fields[0], str(n))
+            self.assertEqual(fields[1:], tail)
+
+    def test_row(self):
+        for n in (1, 99999, 100000):
+            line = Formats.row(n, VALUES)
+            self.assertTrue(line.startswith('#{}'.format(n)))
+            self.assertEqual(line.split()[1:],
+                             Formats.result_line(n, VALUES).split()[1:])
+
+    def test_text_writer(self):
+        directory = tempfile.mkdtemp()
+        filename = path.join(directory, 'results.txt')
+        try:
+            with TextResultWriter(filename) as writer:
+                writer.count = 99998
+                for _ in range(3):
+                    writer.write(VALUES)
+            with open(filename) as file:
+                lines = file.read().splitlines()
+        finally:
+            os.remove(filename)
+            os.rmdir(directory)
+
+        self.assertEqual(lines[0], Formats.HEADER)
+        self.assertEqual([line.split()[0] for line in lines[1:]],
+                         ['99999', '100000', '100001'])
+        for line in lines[1:]:
+            self.assertEqual(line.split()[1:],
+                             Formats.result_line(1, VALUES).split()[1:])
+
+
+if __name__ == '__main__':
+    unittest.main()
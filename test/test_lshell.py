@@ -0,0 +1,121 @@
+import os
+import sys
+import tempfile
+import unittest
+from os import path
+import numpy as np
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from lshell import LShellModel  # noqa: E402
+
+
+def dipole_model(g10, g11=0.0, h11=0.0):
+    # a model file with the degree 1 terms only, the same at both epochs
+    lines = ['# dipole', '1 1 3 2 0 2000.0 2030.0', '2000.0 2030.0',
+             '1 0 {0} {0}'.format(g10), '1 1 {0} {0}'.format(g11),
+             '1 -1 {0} {0}'.format(h11)]
+    handle, filename = tempfile.mkstemp(suffix='.shc')
+    with os.fdopen(handle, 'w') as file:
+        file.write('\n'.join(lines) + '\n')
+    try:
+        return LShellModel(filename)
+    finally:
+        os.remove(filename)
+
+
+class LShellModelTest(unittest.TestCase):
+
+    LATS = np.array([-70.0, -62.25, -45.0, -20.0, 0.5, 15.0, 40.0, 55.0,
+                     75.0])
+    LONS = np.array([-64.25, 10.0, 120.0, -150.0, 0.0, 75.0, -100.0, 30.0,
+                     170.0])
+    ALTS = np.array([0.0, 850.0, 400.0, 2000.0, 850.0, 0.0, 600.0, 100.0,
+                     850.0])
+
+    # (r km, colatitude, east longitude, date) and the field
+    # (B_r, B_theta, B_phi) in nT of an independent IGRF-14 code
+    FIELD = (
+        ((7221.2, 150.0, -64.0, '2001-10-16'), (21745.3, -13519.5, 2666.8)),
+        ((6771.2, 45.0, 120.0, '2017-03-18'), (-41150.8, -20238.0, -2769.2)),
+        ((6371.2, 90.0, 0.0, '2020-01-01'), (16099.2, -27637.1, -2249.5)),
+        ((8371.2, 20.0, 250.0, '2010-07-02'), (-25850.4, -2758.3, 591.2)),
+    )
+
+    # ground L of observatories as published, to one decimal
+    STATIONS = (
+        ('Arecibo', 18.35, -66.75, '2000-01-01', 1.4),
+        ('Vernadsky', -65.25, -64.25, '2000-01-01', 2.5),
+        ('Halley', -75.58, -26.66, '2010-01-01', 4.6),
+        ('Sodankyla', 67.37, 26.63, '2010-01-01', 5.2),
+        ('Kilpisjarvi', 69.05, 20.79, '2000-01-01', 6.0),
+    )
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model = LShellModel()
+
+    def dipole_l(self, model):
+        # L = r / cos^2 of the latitude from the dipole equator
+        g, h = model.coefficients([2010.0])
+        axis = np.array([g[0, 1, 1], h[0, 1, 1], g[0, 1, 0]])
+        xyz = LShellModel.geodetic_to_cartesian(
+            self.LATS, self.LONS, self.ALTS)
+        r = np.sqrt((xyz**2).sum(axis=0))
+        sin_lat = axis.dot(xyz) / r / np.sqrt((axis**2).sum())
+        return r / (1 - sin_lat**2)
+
+    def test_dipole(self):
+        dates = np.full(len(self.LATS), '2010-01-01', dtype='datetime64[s]')
+        for model in (dipole_model(-29404.8),
+                      dipole_model(-29404.8, -1450.9, 4652.5)):
+            values = model.get_data(dates, self.LATS, self.LONS, self.ALTS)
+            np.testing.assert_allclose(values, self.dipole_l(model),
+                                       rtol=1e-3)
+
+    def test_field(self):
+        for (r, theta, phi, date), expected in self.FIELD:
+            g, h = self.model.coefficients(LShellModel.decimal_years(
+                np.array([date], dtype='datetime64[s]')))
+            t, p = np.radians(theta), np.radians(phi)
+            up = np.array([np.sin(t) * np.cos(p), np.sin(t) * np.sin(p),
+                           np.cos(t)])
+            south = np.array([np.cos(t) * np.cos(p), np.cos(t) * np.sin(p),
+                              -np.sin(t)])
+            east = np.array([-np.sin(p), np.cos(p), 0.0])
+
+            b = self.model.field((r / LShellModel.RE * up)[:, None],
+                                 np.moveaxis(g, 0, -1),
+                                 np.moveaxis(h, 0, -1))[:, 0]
+            np.testing.assert_allclose(
+                [b.dot(up), b.dot(south), b.dot(east)], expected, atol=0.5)
+
+    def test_stations(self):
+        names, lats, lons, dates, expected = zip(*self.STATIONS)
+        values = self.model.get_data(
+            np.array(dates, dtype='datetime64[s]'), lats, lons,
+            np.zeros(len(lats)))
+        for name, value, published in zip(names, values, expected):
+            self.assertAlmostEqual(value, published, delta=0.1, msg=name)
+
+    def test_chunks(self):
+        # points traced in several chunks give the values traced together,
+        # up to the far field terms dropped for the whole chunk
+        rng = np.random.default_rng(11)
+        count = 7
+        lats = rng.uniform(-70, 70, count)
+        lons = rng.uniform(-180, 180, count)
+        dates = np.full(count, '2017-03-18', dtype='datetime64[s]')
+        whole = self.model.get_data(dates, lats, lons, 850.0)
+
+        chunk_size = LShellModel.CHUNK_SIZE
+        LShellModel.CHUNK_SIZE = 3
+        try:
+            chunked = self.model.get_data(dates, lats, lons, 850.0)
+        finally:
+            LShellModel.CHUNK_SIZE = chunk_size
+        np.testing.assert_allclose(chunked, whole, rtol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import sys
+import unittest
+from os import path
+from datetime import datetime, timedelta
+import numpy as np
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from mlt import MltProfileIndex  # noqa: E402
+
+
+def linear_scan(times, mlt):
+    # the nearest profile sample as it was looked up row by row
+    delta = float('inf')
+    k = 0
+    for i, v in enumerate(times):
+        if abs(v - mlt) < delta:
+            k = i
+            delta = abs(v - mlt)
+    return k
+
+
+def day_correction(date, kt):
+    date_out = datetime(date.year, date.month, date.day)
+    date_out += timedelta(seconds=int(kt * 3600.0))
+
+    delta = date_out - date
+    if abs(delta.total_seconds()) > 12 * 60 * 60:
+        if delta.total_seconds() > 0:
+            date_out += timedelta(days=-1)
+        else:
+            date_out += timedelta(days=1)
+    return date_out
+
+
+class MltProfileIndexTest(unittest.TestCase):
+
+    STEP = 0.025
+    POINTS = 959
+
+    def profiles(self, rng, count):
+        # IRI like profiles, MLT growing with UT and wrapping at 24 h,
+        # rounded as in the IRI output, and a few arbitrary ones
+        hours = np.arange(self.POINTS) * self.STEP
+        for _ in range(count):
+            offset = rng.uniform(0, 24)
+            wobble = rng.uniform(0, 1.5) * np.sin(
+                2 * np.pi * hours / 24 + rng.uniform(0, 2 * np.pi))
+            yield np.round(np.mod(hours + offset + wobble, 24.0), 2)
+        for _ in range(count // 4):
+            yield np.round(rng.uniform(0, 24, self.POINTS), 2)
+
+    def test_nearest(self):
+        rng = np.random.default_rng(15)
+        wrap_rows = 0
+        for profile in self.profiles(rng, 40):
+            index = MltProfileIndex(profile.tolist(), self.STEP)
+            mlts = np.concatenate([
+                np.round(rng.uniform(0, 24, 300), 2),
+                rng.uniform(23.9, 24.0, 10), rng.uniform(0.0, 0.1, 10),
+                profile[rng.integers(0, self.POINTS, 10)]])
+            found = index.nearest(mlts)
+
+            for mlt, k in zip(mlts.tolist(), found.tolist()):
+                linear = np.abs(profile - mlt)
+                circular = np.minimum(linear, 24.0 - linear)
+                # the closest sample on the 24 h circle, the earliest on ties
+                self.assertEqual(k, int(np.flatnonzero(
+                    circular == circular.min())[0]))
+
+                old = linear_scan(profile.tolist(), mlt)
+                closest = circular == circular.min()
+                if (linear[closest] != linear.min()).any():
+                    # across the 24 -> 0 wrap the old scan can pick
+                    # a sample almost a day away
+                    wrap_rows += old != k
+                    self.assertLessEqual(circular[k], circular[old])
+                else:
+                    self.assertEqual(k, old)
+
+        self.assertGreater(wrap_rows, 0)
+
+    def test_point_times(self):
+        rng = np.random.default_rng(12)
+        corrections = set()
+        for profile in self.profiles(rng, 20):
+            index = MltProfileIndex(profile.tolist(), self.STEP)
+            dates = np.datetime64('2001-10-16') + rng.integers(
+                0, 3 * 86400, 200).astype('timedelta64[s]')
+            mlts = rng.uniform(0, 24, len(dates))
+            kt, date_out = index.point_times(dates, mlts)
+
+            for date, mlt, t, out in zip(dates.tolist(), mlts.tolist(),
+                                         kt.tolist(), date_out.tolist()):
+                self.assertEqual(t, index.nearest([mlt])[0] * self.STEP)
+                expected = day_correction(date, t)
+                self.assertEqual(out, expected)
+                corrections.add((expected.date() - date.date()).days)
+
+        # both corrections and no correction at all were exercised
+        self.assertEqual(corrections, {-1, 0, 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
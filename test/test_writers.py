@@ -0,0 +1,76 @@
+import sys
+import shutil
+import tempfile
+import unittest
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from formats import Formats  # noqa: E402
+from writers import (ResultWriter, Hdf5ResultWriter,  # noqa: E402
+                     NpzResultWriter, TextResultWriter)
+
+
+def result_rows(count):
+    for i in range(count):
+        yield ('F{}'.format(13 + i % 3), -62.0 - i / 100.0, -64.0 + i / 7.0,
+               840.0 + i, 1500.5, 2500.25, 1.5e10 * (i + 1), 5.5e9, 1.1e8,
+               2.2e7, i % 2, -1, '2001-10-16 12:{:02d}:00'.format(i % 60),
+               12.0 + i / 60.0, 3.25, 3.5, 12.625,
+               '2001-10-16 12:37:{:02d}'.format(i % 60), 5.0 + i / 1000.0)
+
+
+class ResultWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def round_trip(self, extension, count, chunk_size=4):
+        filename = path.join(self.directory, 'results' + extension)
+        rows = list(result_rows(count))
+        with ResultWriter.create(filename, chunk_size) as writer:
+            for row in rows:
+                writer.write(row)
+        self.assertEqual(writer.count, count)
+        return rows, writer, filename
+
+    def check(self, rows, table):
+        self.assertEqual(table.dtype, ResultWriter.DTYPE)
+        self.assertEqual(len(table), len(rows))
+        for row, stored in zip(rows, table.tolist()):
+            self.assertEqual(
+                [value.decode() if isinstance(value, bytes) else value
+                 for value in stored], list(row))
+
+    def test_hdf5(self):
+        # a partial last chunk is flushed on close
+        rows, writer, filename = self.round_trip('.h5', 10)
+        self.assertIsInstance(writer, Hdf5ResultWriter)
+        self.check(rows, Hdf5ResultWriter.load(filename))
+
+    def test_npz(self):
+        rows, writer, filename = self.round_trip('.npz', 8)
+        self.assertIsInstance(writer, NpzResultWriter)
+        self.assertEqual(writer.chunks, 2)
+        self.check(rows, NpzResultWriter.load(filename))
+
+    def test_empty(self):
+        for extension, writer_class in (('.hdf5', Hdf5ResultWriter),
+                                        ('.npz', NpzResultWriter)):
+            rows, _, filename = self.round_trip(extension, 0)
+            self.check(rows, writer_class.load(filename))
+
+    def test_text(self):
+        rows, writer, filename = self.round_trip('.txt', 6)
+        self.assertIsInstance(writer, TextResultWriter)
+        with open(filename) as file:
+            lines = file.read().splitlines()
+        self.assertEqual(lines, [Formats.HEADER] + [
+            Formats.result_line(i + 1, row) for i, row in enumerate(rows)])
+
+
+if __name__ == '__main__':
+    unittest.main()
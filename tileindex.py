@@ -0,0 +1,169 @@
+import os
+import json
+import numpy as np
+from filelist import FileList
+from fileindex import CoverageGrid
+from readers import DataReader
+
+
+class TileIndex:
+
+    EXTENSIONS = ('.hdf5', '.txt', '.txt.gz', '.cdf')
+
+    # one span is a run of file rows inside one tile and one time bucket
+    SPAN_DTYPE = np.dtype([
+        ('tile', 'i4'), ('bucket', 'i4'), ('file', 'i4'),
+        ('start', 'i8'), ('stop', 'i8')])
+
+    def __init__(self, directory, resolution=5.0, bucket=86400):
+        os.makedirs(directory, exist_ok=True)
+        self.files_name = os.path.join(directory, 'files.json')
+        self.spans_name = os.path.join(directory, 'spans.bin')
+
+        self.grid = CoverageGrid(resolution)
+        self.bucket = bucket
+        self.files = dict()
+        self.next_id = 0
+
+        try:
+            with open(self.files_name) as file:
+                state = json.load(file)
+            # a different grid makes the stored spans useless
+            if state['resolution'] == resolution and \
+                    state['bucket'] == bucket:
+                self.files = state['files']
+                self.next_id = state['next_id']
+        except (IOError, ValueError, KeyError):
+            pass
+
+        self.spans = self.__open_spans() if self.files else \
+            np.zeros(0, dtype=TileIndex.SPAN_DTYPE)
+
+    def __open_spans(self):
+        if not os.path.exists(self.spans_name) or \
+                not os.path.getsize(self.spans_name):
+            return np.zeros(0, dtype=TileIndex.SPAN_DTYPE)
+        return np.memmap(self.spans_name, dtype=TileIndex.SPAN_DTYPE,
+                         mode='r')
+
+    @staticmethod
+    def data_files(root):
+        # the same files a run without the index goes through
+        for name in FileList.get(root):
+            if name.endswith(TileIndex.EXTENSIONS):
+                yield os.path.abspath(os.path.join(root, name))
+
+    def file_spans(self, file_id, data):
+        valid = np.flatnonzero(
+            np.isfinite(data['lat']) & np.isfinite(data['long']))
+        if not len(valid):
+            return np.zeros(0, dtype=TileIndex.SPAN_DTYPE)
+
+        i, j = self.grid.cells(data['lat'][valid], data['long'][valid])
+        tiles = i * self.grid.shape[1] + j
+        seconds = data['date'][valid].astype('datetime64[s]').astype('int64')
+        buckets = seconds // self.bucket
+
+        breaks = np.flatnonzero(
+            (np.diff(tiles) != 0) | (np.diff(buckets) != 0) |
+            (np.diff(valid) != 1)) + 1
+        starts = np.r_[0, breaks]
+        stops = np.r_[breaks, len(valid)]
+
+        spans = np.zeros(len(starts), dtype=TileIndex.SPAN_DTYPE)
+        spans['tile'] = tiles[starts]
+        spans['bucket'] = buckets[starts]
+        spans['file'] = file_id
+        spans['start'] = valid[starts]
+        spans['stop'] = valid[stops - 1] + 1
+        return spans
+
+    def update(self, root, te_name='Te_hgn'):
+        # only new and changed files are read, the spans of the other
+        # files are kept as they are
+        root = os.path.abspath(root)
+        found = dict()
+        for filename in TileIndex.data_files(root):
+            stat = os.stat(filename)
+            found[filename] = (stat.st_mtime, stat.st_size)
+
+        dropped = []
+        for filename, entry in list(self.files.items()):
+            if not filename.startswith(root + os.sep):
+                continue
+            if found.get(filename) != (entry['mtime'], entry['size']):
+                dropped.append(entry['id'])
+                del self.files[filename]
+
+        added = []
+        indexed = 0
+        for filename, (mtime, size) in found.items():
+            if filename in self.files:
+                continue
+            indexed += 1
+            data = DataReader.coordinates(filename, te_name)
+            file_id = self.next_id
+            self.next_id += 1
+            self.files[filename] = {'id': file_id, 'mtime': mtime,
+                                    'size': size}
+            if data is not None and len(data):
+                added.append(self.file_spans(file_id, data))
+
+        if dropped or indexed:
+            spans = self.spans[~np.isin(self.spans['file'], dropped)]
+            spans = np.concatenate([np.asarray(spans)] + added)
+            spans = spans[np.lexsort(
+                (spans['start'], spans['file'], spans['bucket'],
+                 spans['tile']))]
+            self.spans = None
+
+            spans.tofile(self.spans_name + '.tmp')
+            os.replace(self.spans_name + '.tmp', self.spans_name)
+            with open(self.files_name + '.tmp', 'w') as file:
+                json.dump({'resolution': self.grid.resolution,
+                           'bucket': self.bucket,
+                           'next_id': self.next_id,
+                           'files': self.files}, file)
+            os.replace(self.files_name + '.tmp', self.files_name)
+            self.spans = self.__open_spans()
+
+        return indexed, len(dropped)
+
+    def query(self, configuration, root=None, start=None, end=None):
+        # spans are sorted by tile, so every tile of the box is
+        # a binary search in the mapped file
+        tiles = np.flatnonzero(self.grid.box(configuration).ravel())
+        tile_column = self.spans['tile']
+        lo = np.searchsorted(tile_column, tiles, side='left')
+        hi = np.searchsorted(tile_column, tiles, side='right')
+        spans = np.concatenate(
+            [np.asarray(self.spans[a:b]) for a, b in zip(lo, hi) if b > a] +
+            [np.zeros(0, dtype=TileIndex.SPAN_DTYPE)])
+
+        if start is not None:
+            seconds = np.datetime64(start, 's').astype('int64')
+            spans = spans[spans['bucket'] >= seconds // self.bucket]
+        if end is not None:
+            seconds = np.datetime64(end, 's').astype('int64')
+            spans = spans[spans['bucket'] <= seconds // self.bucket]
+
+        names = {entry['id']: filename
+                 for filename, entry in self.files.items()}
+        if root is not None:
+            root = os.path.abspath(root)
+            names = {file_id: filename for file_id, filename in names.items()
+                     if os.path.dirname(filename) == root}
+
+        result = dict()
+        for file_id in np.unique(spans['file']).tolist():
+            if file_id not in names:
+                continue
+            rows = spans[spans['file'] == file_id]
+            rows = rows[np.argsort(rows['start'])]
+            starts, stops = rows['start'], rows['stop']
+            # spans of a file never overlap, adjacent ones are merged
+            breaks = np.flatnonzero(starts[1:] != stops[:-1]) + 1
+            result[names[file_id]] = list(zip(
+                starts[np.r_[0, breaks]].tolist(),
+                stops[np.r_[breaks - 1, len(rows) - 1]].tolist()))
+        return result
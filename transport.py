@@ -0,0 +1,58 @@
+import threading
+from time import monotonic
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import RunMetrics
+from retry import CancellationToken
+
+
+class ModelTransport:
+
+    def __init__(self, max_in_flight=4, rate_limit=1.0, metrics=None,
+                 token=None, timeout=60.0):
+        self.max_in_flight = max_in_flight
+        self.rate_limit = rate_limit
+        self.metrics = metrics if metrics is not None else RunMetrics()
+        self.token = token if token is not None else CancellationToken()
+        self.timeout = timeout
+
+        # keep-alive connections shared by all model clients
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_in_flight)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.executor = ThreadPoolExecutor(max_in_flight)
+        self.lock = threading.Lock()
+        self.next_slot = dict()
+
+    def __wait_for_slot(self, url):
+        if self.rate_limit <= 0:
+            return
+
+        host = urlsplit(url).netloc
+        with self.lock:
+            now = monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + 1.0 / self.rate_limit
+        if slot > now:
+            self.metrics.record('transport.throttle', slot - now)
+            self.token.wait(slot - now)
+
+    def post(self, url, data=None, headers=None, proxies=None):
+        self.token.check()
+        self.__wait_for_slot(url)
+        # a request never hangs for longer than the timeout, so
+        # a cancelled run does not wait for a dead connection
+        return self.session.post(
+            url, data=data, headers=headers, proxies=proxies,
+            timeout=self.timeout)
+
+    def submit(self, function, *args, **kwargs):
+        return self.executor.submit(function, *args, **kwargs)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
@@ -0,0 +1,127 @@
+import os
+import zipfile
+import numpy as np
+from formats import Formats
+import warnings
+with warnings.catch_warnings():
+    warnings.filterwarnings('ignore', category=FutureWarning)
+    import h5py
+
+
+class ResultWriter:
+
+    # strings are stored as fixed size bytes, which HDF5 and NPZ both keep
+    DTYPE = np.dtype([(name, dtype.replace('U', 'S'))
+                      for name, dtype, _ in Formats.COLUMNS])
+
+    def __init__(self, filename, chunk_size=4096):
+        self.filename = filename
+        self.chunk_size = chunk_size
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @staticmethod
+    def create(filename, chunk_size=4096):
+        name = filename.lower()
+        if name.endswith('.h5') or name.endswith('.hdf5'):
+            return Hdf5ResultWriter(filename, chunk_size)
+        if name.endswith('.npz'):
+            return NpzResultWriter(filename, chunk_size)
+        return TextResultWriter(filename, chunk_size)
+
+    @staticmethod
+    def target_filename(filename, name):
+        root, ext = os.path.splitext(filename)
+        return '{}_{}{}'.format(root, name, ext)
+
+    def close(self):
+        self.file.close()
+
+
+class TextResultWriter(ResultWriter):
+
+    def __init__(self, filename, chunk_size=4096):
+        super().__init__(filename, chunk_size)
+        self.file = open(filename, 'w')
+        self.file.write(Formats.HEADER + '\n')
+
+    def write(self, values):
+        # the text is formatted from the original values
+        self.count += 1
+        self.file.write(Formats.result_line(self.count, values) + '\n')
+
+
+class TableResultWriter(ResultWriter):
+
+    # rows are collected into structured arrays of chunk_size rows, which
+    # the table formats store with write_chunk
+
+    def __init__(self, filename, chunk_size=4096):
+        super().__init__(filename, chunk_size)
+        self.rows = []
+
+    def write(self, values):
+        self.rows.append(values)
+        self.count += 1
+        if len(self.rows) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.write_chunk(np.array(self.rows, dtype=ResultWriter.DTYPE))
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        super().close()
+
+
+class Hdf5ResultWriter(TableResultWriter):
+
+    def __init__(self, filename, chunk_size=4096):
+        super().__init__(filename, chunk_size)
+        self.file = h5py.File(filename, 'w')
+        self.dataset = self.file.create_dataset(
+            'results', shape=(0,), maxshape=(None,),
+            dtype=ResultWriter.DTYPE, chunks=(chunk_size,),
+            compression='gzip', shuffle=True)
+        self.written = 0
+
+    def write_chunk(self, chunk):
+        self.dataset.resize((self.written + len(chunk),))
+        self.dataset[self.written:] = chunk
+        self.written += len(chunk)
+
+    @staticmethod
+    def load(filename):
+        with h5py.File(filename, 'r') as file:
+            return file['results'][()]
+
+
+class NpzResultWriter(TableResultWriter):
+
+    def __init__(self, filename, chunk_size=4096):
+        super().__init__(filename, chunk_size)
+        self.file = zipfile.ZipFile(
+            filename, 'w', compression=zipfile.ZIP_DEFLATED)
+        self.chunks = 0
+
+    def write_chunk(self, chunk):
+        # every chunk is a member of the archive, np.load lists them all
+        name = 'results_{:06d}.npy'.format(self.chunks)
+        with self.file.open(name, 'w', force_zip64=True) as member:
+            np.lib.format.write_array(member, chunk, allow_pickle=False)
+        self.chunks += 1
+
+    @staticmethod
+    def load(filename):
+        with np.load(filename) as archive:
+            chunks = [archive[name] for name in sorted(archive.files)]
+        if not chunks:
+            return np.zeros(0, dtype=ResultWriter.DTYPE)
+        return np.concatenate(chunks)